@@ -1,9 +1,12 @@
 ## std libs
 import heapq
 import math
+from array import array
+
+## 3rd party libs
+import numpy as np
 
 ## custom libs
-from field import Field
 # from maze import Maze
 
 
@@ -35,54 +38,209 @@ def euclidean_distance(a: tuple, b: tuple):
     return math.sqrt((a[0] - b[0])**2 + (a[1] - b[1])**2)
 
 
-def astar(maze, start: set, end: set) -> list:
+DENSE_LIMIT = 5_000_000          ## mazes with more fields than this keep the A* state in dicts (memory grows with the searched area, not with the maze). Below it the four int32 arrays take at most 80 MB
+QUERY_ID_LIMIT = 2**31 - 1       ## the query stamps are int32, the arrays are cleared before they would overflow
+
+
+class _SparseScores(dict):
     '''
-    STD A* path finding algorithm.
+    Dict that can replace the preallocated score arrays of 'AStarGrid', missing entries read as 0 like in a fresh array.
+    '''
+    def __missing__(self, key):
+        return 0
+
+
+class _PaddedWallLookup:
+    '''
+    Reads walls through 'Maze.wall_lookup' with the padded indices of 'AStarGrid', without copying the grid (e.g. for memory-mapped mazes).
+    '''
+    def __init__(self, wall_lookup, width: int, height: int):
+        self.wall_lookup = wall_lookup
+        self.width = width
+        self.height = height
+
+    def __getitem__(self, index: int) -> int:
+        x, y = divmod(index, self.height + 2)
+        if 0 < x <= self.width and 0 < y <= self.height:
+            return self.wall_lookup[x-1, y-1]
+        return 1
+
+
+class AStarGrid:
+    '''
+    A* on linear field indices with preallocated score/parent arrays.
+    The wall grid gets a 1 field border of walls, so neighbors never need a bounds check. index = (x+1)*(height+2) + (y+1)
+    The grid and the arrays are prepared once, so many queries on the same maze don't pay for it again.
+    Memory-mapped/packed wall grids are read in place and huge mazes (over 'DENSE_LIMIT' fields) use dicts instead of arrays.
+    Instead of clearing the arrays between queries every entry is stamped with the id of the query that wrote it.
+    Params:
+        maze Maze -- Maze object with a valid 'walls' grid
+    '''
+
+    def __init__(self, maze):
+        self.width = maze.width
+        self.height = maze.height
+        size = (maze.width + 2) * (maze.height + 2)
+        if isinstance(maze.walls, np.ndarray):
+            self.walls = np.pad(maze.walls, 1, constant_values=1).tobytes()     ## walls[index] is 1 for a wall
+        else:
+            self.walls = _PaddedWallLookup(maze.wall_lookup, maze.width, maze.height)
+
+        self.dense = size <= DENSE_LIMIT
+        self._reset()
+
+
+    def _reset(self):
+        '''
+        (Re)creates the score/parent arrays (int32, indices and scores stay below 'DENSE_LIMIT') and restarts the query ids.
+        '''
+        size = (self.width + 2) * (self.height + 2)
+        if self.dense:
+            self.g_score = array('i', [0]) * size     ## cost from the start
+            self.parent = array('i', [0]) * size      ## pointer backwards
+            self.seen = array('i', [0]) * size        ## id of the query that last set 'g_score'/'parent' of the field
+            self.closed = array('i', [0]) * size      ## id of the query that last expanded the field
+        else:
+            self.g_score, self.parent, self.seen, self.closed = _SparseScores(), _SparseScores(), _SparseScores(), _SparseScores()
+        self.query_id = 0
+
+
+    def path(self, start: set, end: set) -> list:
+        '''
+        Params:
+            start: set -- like (0,0)
+            end: set -- like (3,4)
+        Returns:
+            path list -- Path like [start,(1,2),(2,2),...,end] or None if there is no path
+        '''
+        height = self.height + 2
+        size = (self.width + 2) * height
+        if self.query_id >= QUERY_ID_LIMIT:
+            self._reset()
+        walls, g_score, parent, seen, closed = self.walls, self.g_score, self.parent, self.seen, self.closed
+        self.query_id += 1
+        query_id = self.query_id
+
+        start_index = (start[0]+1)*height + start[1]+1
+        end_index = (end[0]+1)*height + end[1]+1
+        ex, ey = end[0]+1, end[1]+1
+
+        ## heap entries are single ints, compared a lot faster than tuples: ((f * (max_h+1)) + h) * size + index
+        ## so ties on 'f' are broken by the smaller heuristic (closer to the end) and then by the index
+        h_factor = self.width + self.height + 1
+        g_score[start_index] = 0
+        seen[start_index] = query_id
+        h = abs(start[0]+1-ex) + abs(start[1]+1-ey)
+        open_set = [(h * h_factor + h) * size + start_index]
+
+        while open_set:
+            current = heapq.heappop(open_set) % size
+            if closed[current] == query_id:
+                continue                                ## stale entry, the field was already expanded with a lower score
+            closed[current] = query_id
+
+            if current == end_index:
+                ## Reconstruct path
+                path = []
+                while current != start_index:
+                    x, y = divmod(current, height)
+                    path.append((x-1, y-1))
+                    current = parent[current]
+                path.append(tuple(start))
+                path.reverse()
+                return path
+
+            tentative_g_score = g_score[current] + 1
+            for neighbor in (current-height, current+height, current-1, current+1):    ## left, right, up, down
+                if walls[neighbor] or closed[neighbor] == query_id:
+                    continue
+                if seen[neighbor] != query_id or tentative_g_score < g_score[neighbor]:
+                    seen[neighbor] = query_id
+                    g_score[neighbor] = tentative_g_score
+                    parent[neighbor] = current
+                    nx, ny = divmod(neighbor, height)
+                    h = abs(nx-ex) + abs(ny-ey)     ## manhattan distance, inlined
+                    heapq.heappush(open_set, ((tentative_g_score + h) * h_factor + h) * size + neighbor)
+
+        return None  # No path found
+
+
+def astar_junctions(graph, start: set, end: set) -> list:
+    '''
+    A* on a 'JunctionGraph', every corridor is expanded at once. Start and end must be nodes of the graph.
+    The manhattan distance is still admissible since a corridor is never shorter than the manhattan distance between its ends.
     Params:
-        maze Maze -- Maze object with valid 'fields' field
+        graph JunctionGraph -- see 'Maze.build_junction_graph'
         start: set -- like (0,0)
         end: set -- like (3,4)
     Returns:
-        path list -- Path like [start,(1,2),(2,2),...,end]
+        path list -- Path like [start,(1,2),(2,2),...,end] or None if there is no path
     '''
-    height = maze.height
-    width = maze.width
-    open_set = []
-    heapq.heappush(open_set, (0, start))
-    
-    heuristic = manhattan_distance                  ## what heuristic is used for scoring
-    came_from = {}                                  ## pointer backwards 
-    g_score = {start: 0}                            ##
-    f_score = {start: heuristic(start, end)}        ##
-    DIRECTIONS = [(-1,0),(1,0),(0,-1),(0,1)]        ## directions a player can move (left,up,right,down)
+    height = graph.height
+    corridors = graph.corridors
+    start_node = start[0]*height + start[1]
+    end_node = end[0]*height + end[1]
+    ex, ey = end
 
+    g_score = {start_node: 0}
+    parent = {start_node: None}        ## node -> (previous node, corridor that leads here)
+    closed = set()
+    open_set = [(manhattan_distance(start, end), 0, start_node)]
     while open_set:
-        _, current_field = heapq.heappop(open_set)
-
-        if current_field == end:
-            # Reconstruct path
-            path = []
-            while current_field in came_from:
-                path.append(current_field)
-                current_field = came_from[current_field]
-            path.append(start)
-            path.reverse()
+        _, g, current = heapq.heappop(open_set)
+        if current in closed:
+            continue                                ## stale entry
+        closed.add(current)
+
+        if current == end_node:
+            ## Reconstruct path from the corridors
+            segments = []
+            while parent[current] is not None:
+                current, cells = parent[current]
+                segments.append(cells)
+            path = [tuple(start)]
+            for cells in reversed(segments):
+                path.extend(divmod(cell, height) for cell in cells)
             return path
 
-        for dx, dy in DIRECTIONS:
-            
-            current_neighbor = (current_field[0]+dx, current_field[1]+dy)
-            x, y = current_neighbor
-            if 0 <= x < width and 0 <= y < height and maze.fields[x][y].is_wall() == False:
-            
-                tentative_g_score = g_score[current_field] + 1
-                if current_neighbor not in g_score or tentative_g_score < g_score[current_neighbor]:
-                    came_from[current_neighbor] = current_field
-                    g_score[current_neighbor] = tentative_g_score
-                    f_score[current_neighbor] = tentative_g_score + heuristic(current_neighbor, end)
-                    heapq.heappush(open_set, (f_score[current_neighbor], current_neighbor))
-    
+        for cells, _, target in corridors[current]:
+            if target in closed:
+                continue
+            tentative_g_score = g + len(cells)
+            if tentative_g_score < g_score.get(target, tentative_g_score + 1):
+                g_score[target] = tentative_g_score
+                parent[target] = (current, cells)
+                tx, ty = divmod(target, height)
+                heapq.heappush(open_set, (tentative_g_score + abs(tx-ex) + abs(ty-ey), tentative_g_score, target))
+
     return None  # No path found
 
 
+def astar(maze, start: set, end: set) -> list:
+    '''
+    STD A* path finding algorithm.
+    If the maze has a junction graph with the start and end as nodes the graph is searched instead of the grid ('astar_junctions').
+    Params:
+        maze Maze -- Maze object with a valid 'walls' grid
+        start: set -- like (0,0)
+        end: set -- like (3,4)
+    Returns:
+        path list -- Path like [start,(1,2),(2,2),...,end]
+    '''
+    graph = getattr(maze, 'junction_graph', None)
+    if graph is not None and graph.is_node(start) and graph.is_node(end):
+        return astar_junctions(graph, start, end)
+    return AStarGrid(maze).path(start, end)
+
 
+def astar_many(maze, pairs: list) -> list:
+    '''
+    A* for many queries on the same maze, the maze is only prepared once.
+    Params:
+        maze Maze -- Maze object with a valid 'walls' grid
+        pairs list -- list of (start, end) like [((1,1),(3,4)),...]
+    Returns:
+        paths list -- one path (or None) per pair, see 'astar'
+    '''
+    grid = AStarGrid(maze)
+    return [grid.path(start, end) for start, end in pairs]
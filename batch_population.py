@@ -0,0 +1,378 @@
+## custom libs
+from player import Player, FITNESS_MODES
+from selection import select_parents, elite_ids
+
+## std libs
+import random
+import time
+
+## 3rd party libs
+import numpy as np
+
+
+INITIAL_PATH_CAPACITY = 64                  ## columns of 'cells' and 'moves' before they grow for the first time
+VISITED_BATCH_BYTES = 64 * 1024**2          ## memory for the bit-packed visited maps of the individuals that walk (or mutate) at once
+
+
+class BatchPopulation:
+    '''
+    The whole population of the genetic algorithm stored as NumPy arrays instead of 'Player' objects.
+    Walking, fitness, selection, crossover and mutation work on all individuals at once.
+    Behaves like a population of 'Player' objects that use 'crossover_random' and 'mutate'.
+
+    Fields are addressed by their flat index 'x*height + y' (same as 'Maze.walls.ravel()').
+    Arrays (P = population size, C = capacity, at least the length of the longest path):
+        cells   -- int32 (P,C) the path of each individual, only the first 'lengths[i]' entries are valid
+        moves   -- uint8 (P,C) index into 'Player.dirs' of each move, the first 'lengths[i]-1' entries are valid
+        lengths -- int32 (P,) length of each path (the start included)
+        active  -- bool (P,) can the individual still walk
+        fitness -- float64 (P,) the lower the better
+    'cells' and 'moves' start with 'INITIAL_PATH_CAPACITY' columns and double when a path outgrows them, so their size follows the paths, not the maze.
+    Individuals don't keep a visited map. The ones that walk or mutate get a bit-packed one (N/8 bytes, N = number of fields in the maze) built from their path,
+    in batches of at most 'VISITED_BATCH_BYTES'. With several batches the random draws are made batch by batch, the results are still reproducible.
+    '''
+
+    def __init__(self, start: set, end: set, maze, size: int, seed: int=None, fitness_mode: str='euclidean'):
+        self.maze = maze
+        self.size = size
+        self.height = maze.height
+        self.start = maze.height * start[0] + start[1]          ## flat index of the start
+        self.end = maze.height * end[0] + end[1]                ## flat index of the end
+        self.end_position = end
+        self.set_fitness_mode(fitness_mode)
+        ## by default take the seed from the 'random' module so 'random.seed' keeps the runs reproducible
+        self.rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+
+        self.neighbors = self._build_neighbor_table(maze)
+        self.field_count = maze.width * maze.height             ## no path is longer than this
+
+        capacity = min(INITIAL_PATH_CAPACITY, self.field_count)
+        self.cells = np.zeros((size, capacity), dtype=np.int32)
+        self.cells[:, 0] = self.start
+        self.moves = np.zeros((size, capacity), dtype=np.uint8)
+        self.lengths = np.ones(size, dtype=np.int32)
+        self.active = np.full(size, self.start != self.end)
+        self.fitness = np.zeros(size, dtype=np.float64)
+        self.profiler = None                                    ## GenerationProfiler or None, set by 'GeneticAlgorithm'
+
+
+    @staticmethod
+    def _build_neighbor_table(maze) -> np.ndarray:
+        '''
+        Returns:
+            neighbors np.ndarray -- int32 (N,4) flat index of the neighbor in each of 'Player.dirs', -1 if it's a wall or out of bounds
+        '''
+        xs, ys = np.meshgrid(np.arange(maze.width), np.arange(maze.height), indexing='ij')
+        xs, ys = xs.ravel(), ys.ravel()
+        walls = np.asarray(maze.walls, dtype=np.uint8).ravel()
+        neighbors = np.full((xs.size, len(Player.dirs)), -1, dtype=np.int32)
+        for d, (dx, dy) in enumerate(Player.dirs):
+            nx, ny = xs + dx, ys + dy
+            in_bounds = (0 <= nx) & (nx < maze.width) & (0 <= ny) & (ny < maze.height)
+            index = np.where(in_bounds, nx * maze.height + ny, 0)
+            neighbors[:, d] = np.where(in_bounds & (walls[index] == 0), index, -1)
+        neighbors[walls == 1] = -1
+        return neighbors
+
+
+    def _ensure_capacity(self, length: int):
+        '''
+        Grows 'cells' and 'moves' (at least doubling them) so they hold paths of the given length.
+        '''
+        capacity = self.cells.shape[1]
+        if length <= capacity:
+            return
+        capacity = min(max(length, 2*capacity), self.field_count)
+        cells = np.zeros((self.size, capacity), dtype=np.int32)
+        cells[:, :self.cells.shape[1]] = self.cells
+        moves = np.zeros((self.size, capacity), dtype=np.uint8)
+        moves[:, :self.moves.shape[1]] = self.moves
+        self.cells, self.moves = cells, moves
+
+
+    def _batches(self, rows: np.ndarray) -> list:
+        '''
+        Returns:
+            batches list -- the rows split so the visited maps of a batch fit in 'VISITED_BATCH_BYTES'
+        '''
+        batch_size = max(VISITED_BATCH_BYTES // ((self.field_count + 7) // 8), 1)
+        return [rows[i:i+batch_size] for i in range(0, rows.size, batch_size)]
+
+
+    def _visited_bits(self, rows: np.ndarray) -> np.ndarray:
+        '''
+        Returns:
+            bits np.ndarray -- uint8 (len(rows),ceil(N/8)) bit-packed map of the fields in the path of each individual, bit 'cell & 7' of byte 'cell >> 3'
+        '''
+        bits = np.zeros((rows.size, (self.field_count + 7) // 8), dtype=np.uint8)
+        lengths = self.lengths[rows]
+        on_path = np.arange(int(lengths.max(initial=0)))[None, :] < lengths[:, None]
+        row_ids, path_ids = np.nonzero(on_path)
+        cells = self.cells[rows[row_ids], path_ids]
+        np.bitwise_or.at(bits, (row_ids, cells >> 3), (1 << (cells & 7)).astype(np.uint8))
+        return bits
+
+
+    @staticmethod
+    def _is_visited(bits: np.ndarray, ids: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        '''
+        Paramaters:
+            bits np.ndarray -- maps returned by '_visited_bits'
+            ids np.ndarray -- row of 'bits' of each cell (broadcast against 'cells')
+            cells np.ndarray -- fields to look up
+        Returns:
+            visited np.ndarray -- bool, is the field in the path
+        '''
+        return ((bits[ids, cells >> 3] >> (cells & 7)) & 1).astype(bool)
+
+
+    def _append(self, rows: np.ndarray, directions: np.ndarray) -> np.ndarray:
+        '''
+        Moves the individuals in the given directions. The directions must be valid.
+        Returns:
+            new_cells np.ndarray -- the field each individual moved to
+        '''
+        lengths = self.lengths[rows]
+        self._ensure_capacity(int(lengths.max(initial=0)) + 1)
+        new_cells = self.neighbors[self.cells[rows, lengths-1], directions]
+        self.cells[rows, lengths] = new_cells
+        self.moves[rows, lengths-1] = directions
+        self.lengths[rows] = lengths + 1
+        self.active[rows[new_cells == self.end]] = False
+        return new_cells
+
+
+    def walk(self, rows: np.ndarray=None):
+        '''
+        Every active individual moves in random directions until it hits a dead end or the exit (batched 'Player.walk').
+        Paramaters:
+            rows np.ndarray -- which individuals should walk, by default all of them
+        '''
+        started = time.perf_counter()
+        rows = np.arange(self.size) if rows is None else rows
+        rows = rows[self.active[rows]]
+        for batch in self._batches(rows):
+            self._walk_batch(batch)
+        if self.profiler is not None:
+            self.profiler.add_time('walk', time.perf_counter() - started)
+
+
+    def _walk_batch(self, rows: np.ndarray):
+        '''
+        See 'walk', for active individuals whose visited maps fit in memory at once.
+        '''
+        bits = self._visited_bits(rows)
+        ids = np.arange(rows.size)                  ## row of each individual in 'bits'
+        while rows.size > 0:
+            neighbors = self.neighbors[self.cells[rows, self.lengths[rows]-1]]
+            valid = (neighbors >= 0) & ~self._is_visited(bits, ids[:, None], np.maximum(neighbors, 0))
+            if self.profiler is not None:
+                self.profiler.count('cells_probed', valid.size)
+            valid_count = valid.sum(axis=1)
+
+            ## dead ends
+            self.active[rows[valid_count == 0]] = False
+            moving = valid_count > 0
+            rows, ids, valid, valid_count = rows[moving], ids[moving], valid[moving], valid_count[moving]
+
+            ## pick a random valid direction for each individual
+            pick = (self.rng.random(rows.size) * valid_count).astype(np.int64)
+            directions = np.argmax(np.cumsum(valid, axis=1) > pick[:, None], axis=1)
+            new_cells = self._append(rows, directions)
+            bits[ids, new_cells >> 3] |= (1 << (new_cells & 7)).astype(np.uint8)
+            if self.profiler is not None:
+                self.profiler.count('steps_walked', rows.size)
+            walking = self.active[rows]
+            rows, ids = rows[walking], ids[walking]
+
+
+    def set_fitness_mode(self, fitness_mode: str):
+        '''
+        Sets the distance 'evaluate' scores with (see 'Player.evaluate'), the next 'evaluate' re-scores every individual with it.
+        For 'maze_distance' 'Maze.evaluate_fields' has to be called first.
+        '''
+        if fitness_mode not in FITNESS_MODES:
+            raise ValueError(f"Unknown fitness mode '{fitness_mode}', expected one of {FITNESS_MODES}")
+        self.fitness_mode = fitness_mode
+        self.distances = np.asarray(self.maze.distances).ravel() if fitness_mode == 'maze_distance' else None     ## flat distance field for the 'maze_distance' fitness
+
+
+    def evaluate(self) -> np.ndarray:
+        '''
+        Moves every individual and then updates the fitness values (distance to the end given by 'fitness_mode', like 'Player.evaluate').
+        Returns:
+            fitness np.ndarray -- the updated fitness values
+        '''
+        self.walk()
+        last_cells = self.cells[np.arange(self.size), self.lengths-1]
+        if self.fitness_mode == 'maze_distance':
+            self.fitness = self.distances[last_cells].astype(np.float64)
+            return self.fitness
+        dx = last_cells // self.height - self.end_position[0]
+        dy = last_cells % self.height - self.end_position[1]
+        if self.fitness_mode == 'manhattan':
+            self.fitness = (np.abs(dx) + np.abs(dy)).astype(np.float64)
+        else:
+            self.fitness = np.sqrt(dx*dx + dy*dy)
+        return self.fitness
+
+
+    def _truncate(self, rows: np.ndarray, lengths: np.ndarray):
+        '''
+        Cuts the paths of the individuals to the given lengths.
+        '''
+        self.lengths[rows] = lengths
+        self.active[rows] = self.cells[rows, lengths-1] != self.end
+
+
+    def _take(self, order: np.ndarray):
+        '''
+        Rebuilds the population from the given individuals (indices may repeat).
+        '''
+        self.cells = self.cells[order]
+        self.moves = self.moves[order]
+        self.lengths = self.lengths[order]
+        self.active = self.active[order]
+        self.fitness = self.fitness[order]
+        self.size = order.size
+
+
+    def selection(self, elitism_rate: float, selection: str='weighted', tournament_size: int=3):
+        '''
+        Same scheme as 'GeneticAlgorithm._selection': rank based weighted selection, single point crossover with a random tail ('Player.crossover_random') and the best individuals are kept as elites.
+        Paramaters:
+            selection str -- 'weighted' or one of the linear time operators of 'selection.py', which don't rank the whole population
+            tournament_size int -- only for the 'tournament' selection
+        '''
+        if selection == 'weighted':
+            ranking = self.ranking()
+            selection_chance = (self.size - np.arange(self.size)) * self.rng.random(self.size)
+        selected_count = int((1-elitism_rate) * self.size) // 2 * 2
+        if selected_count <= 0:
+            return
+        if selection == 'weighted':
+            selected = ranking[self.rng.choice(self.size, size=selected_count, p=selection_chance/selection_chance.sum())]
+            elite_rows = ranking[:self.size - selected_count]
+        else:
+            selected = select_parents(selection, self.fitness, selected_count, self.rng, tournament_size)
+            elite_rows = elite_ids(self.fitness, self.size - selected_count)
+
+        ## pair up the selected individuals
+        first, second = selected[0::2], selected[1::2]
+        if self.profiler is not None:
+            self.profiler.count('crossovers', first.size)
+        first_is_better = self.fitness[first] <= self.fitness[second]
+        better = np.where(first_is_better, first, second)
+        other = np.where(first_is_better, second, first)
+        crossover_index = self.rng.random(better.size) * np.minimum(self.lengths[better], self.lengths[other])
+        crossover_index = np.maximum(crossover_index, 1).astype(np.int32)
+
+        elites = self.size - selected_count
+        self._take(np.concatenate([elite_rows, better, other]))
+        children = np.arange(elites, self.size)
+        self._truncate(children, np.concatenate([crossover_index, crossover_index]))
+        self.walk(children)
+
+
+    def mutation(self, mutation_rate: float):
+        '''
+        Every individual is mutated with the given probability (batched 'Player.mutate').
+        A random field on the path (but not the last one) that still has an unexplored direction is picked, the path is cut there and the individual walks down the unexplored direction.
+        '''
+        rows = np.nonzero(self.rng.random(self.size) <= mutation_rate)[0]
+        if rows.size == 0:
+            return
+        max_length = int(self.lengths[rows].max())
+        path_cells = self.cells[rows, :max_length]
+        on_path = np.arange(max_length)[None, :] < self.lengths[rows][:, None] - 1     ## the last field is never picked, like in 'Player.mutate' (walking on from the exit would leave it mid-path)
+
+        ## directions that are valid from each field on the path given the whole path as visited
+        neighbors = self.neighbors[path_cells]
+        visited = np.empty(neighbors.shape, dtype=bool)
+        offset = 0
+        for batch in self._batches(rows):
+            part = slice(offset, offset + batch.size)
+            visited[part] = self._is_visited(self._visited_bits(batch), np.arange(batch.size)[:, None, None], np.maximum(neighbors[part], 0))
+            offset += batch.size
+        valid = (neighbors >= 0) & ~visited & on_path[:, :, None]
+        if self.profiler is not None:
+            self.profiler.count('cells_probed', int(on_path.sum()) * len(Player.dirs))
+        junctions = valid.any(axis=2)
+        junction_count = junctions.sum(axis=1)
+        has_junction = junction_count > 0
+        rows, valid, junctions, junction_count = rows[has_junction], valid[has_junction], junctions[has_junction], junction_count[has_junction]
+        if rows.size == 0:
+            return
+
+        ## random junction and a random unexplored direction from it
+        pick = (self.rng.random(rows.size) * junction_count).astype(np.int64)
+        junction_ids = np.argmax(np.cumsum(junctions, axis=1) > pick[:, None], axis=1)
+        valid = valid[np.arange(rows.size), junction_ids]
+        pick = (self.rng.random(rows.size) * valid.sum(axis=1)).astype(np.int64)
+        directions = np.argmax(np.cumsum(valid, axis=1) > pick[:, None], axis=1)
+
+        if self.profiler is not None:
+            self.profiler.count('mutations', rows.size)
+        self._truncate(rows, (junction_ids + 1).astype(np.int32))
+        self.active[rows] = True
+        self._append(rows, directions)
+        self.walk(rows)
+
+
+    def restart(self, elite_count: int):
+        '''
+        Partial restart (batched 'GeneticAlgorithm.restart_population'): the best 'elite_count' individuals stay, the others are replaced by random start parts of the elites' paths.
+        The new individuals walk on and get their fitness in the next 'evaluate'.
+        '''
+        ranking = self.ranking()
+        elites = ranking[:elite_count]
+        parents = elites[self.rng.integers(0, elites.size, size=self.size - elites.size)]
+        cuts = self.rng.integers(1, self.lengths[parents] + 1).astype(np.int32)
+        self._take(np.concatenate([elites, parents]))
+        self._truncate(np.arange(elites.size, self.size), cuts)
+
+
+    def ranking(self) -> np.ndarray:
+        '''
+        Returns:
+            ranking np.ndarray -- individuals from the best to the worst
+        '''
+        return np.argsort(self.fitness, kind='stable')
+
+
+    def export_individuals(self, rows: np.ndarray) -> list:
+        '''
+        Returns:
+            individuals list -- list of (cells, genome, fitness, can_walk) like 'GeneticAlgorithm.get_migrants'
+        '''
+        return [(self.cells[row, :self.lengths[row]].tobytes(), self.moves[row, :self.lengths[row]-1].tobytes(), float(self.fitness[row]), bool(self.active[row]))
+                for row in rows.tolist()]
+
+
+    def import_individuals(self, rows: np.ndarray, individuals: list):
+        '''
+        Overwrites the individuals in the given rows, e.g. with migrants from another population.
+        Paramaters:
+            rows np.ndarray -- one row per individual
+            individuals list -- list of (cells, genome, fitness, can_walk) like 'export_individuals'
+        '''
+        for row, (cells, genome, fitness, can_walk) in zip(rows.tolist(), individuals):
+            cells = np.frombuffer(cells, dtype=np.int32)
+            self._ensure_capacity(cells.size)
+            self.cells[row, :cells.size] = cells
+            self.moves[row, :cells.size-1] = np.frombuffer(genome, dtype=np.uint8)
+            self.lengths[row] = cells.size
+            self.active[row] = can_walk
+            self.fitness[row] = fitness
+
+
+    def get_path(self, id: int) -> list:
+        '''
+        Returns:
+            path list -- path of the individual like [start,(1,2),(2,2),...]
+        '''
+        return [(int(cell) // self.height, int(cell) % self.height) for cell in self.cells[id, :self.lengths[id]]]
+
+
+    def get_best_path(self) -> list:
+        return self.get_path(int(np.argmin(self.fitness)))
@@ -0,0 +1,170 @@
+'''
+Runs sweeps of the genetic algorithm over seeds, maze sizes and GA configurations on a process pool.
+Every finished run is appended as one JSON record (JSON lines) to the output file.
+Runs whose key is already in the output file are skipped, so an interrupted sweep can simply be started again.
+
+Example:
+    python batch_runner.py --seeds 42-52 --sizes 40x20 80x40 --population-sizes 100 500 --output runs.jsonl
+'''
+
+## custom libs
+from maze import Maze
+from AStar import astar
+from genetic_algorithm import GeneticAlgorithm
+from maze_cache import MazeCache
+import config as cfg
+
+## std libs
+import os
+import json
+import time
+import itertools
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+DEFAULT_GA_CONFIG = {
+    'max_generations': cfg.GENERATIONS,
+    'population_size': cfg.POPULATION_SIZE,
+    'mutation_rate': cfg.MUTATION_RATE,
+    'elitism_rate': cfg.ELITISM_RATE,
+    'fitness_mode': cfg.FITNESS_MODE,
+    'selection': cfg.SELECTION,
+}
+
+
+def run_key(seed: int, width: int, height: int, ga_config: dict) -> str:
+    '''
+    Returns:
+        key str -- unique key of a run, used to skip finished runs when resuming
+    '''
+    return json.dumps({'seed': seed, 'width': width, 'height': height, 'config': ga_config}, sort_keys=True)
+
+
+def run_single(seed: int, width: int, height: int, ga_config: dict, cache_dir: str=None) -> dict:
+    '''
+    Generates the maze for the seed and solves it with the genetic algorithm.
+    The start is (1,1) and the end is (width-2,height-2), same as in 'config.py'.
+    Paramaters:
+        cache_dir str -- if given the maze and its A* path are loaded from/stored in a 'MazeCache' in this directory (the results are the same)
+    Returns:
+        record dict -- the run parameters and its statistics
+    '''
+    start_time = time.perf_counter()
+    start, end = (1,1), (width-2, height-2)
+
+    if cache_dir is not None:
+        maze, astar_path = MazeCache(cache_dir).load(seed, width, height, start, end)
+    else:
+        maze = Maze(width=width, height=height)
+        maze.generate_random_maze(seed_value=seed, start=start, end=end)
+        astar_path = astar(maze=maze, start=start, end=end)
+
+    gen_algo = GeneticAlgorithm(start_position=start, end_position=end, maze=maze, best_path=astar_path, **ga_config)
+    gen_algo.next_gen()
+
+    return {
+        'key': run_key(seed, width, height, ga_config),
+        'seed': seed,
+        'width': width,
+        'height': height,
+        'config': ga_config,
+        'generations': gen_algo.current_generation,
+        'fitness': gen_algo.fitnesses[-1],
+        'solved': gen_algo.fitnesses[-1] == 0,
+        'wall_time': time.perf_counter() - start_time,
+        'astar_length': None if astar_path is None else len(astar_path),
+    }
+
+
+def load_finished_keys(output_path: str) -> set:
+    '''
+    Returns:
+        keys set -- keys of the runs already recorded in the output file
+    '''
+    if not os.path.exists(output_path):
+        return set()
+    keys = set()
+    with open(output_path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                keys.add(json.loads(line)['key'])
+            except (json.JSONDecodeError, KeyError):
+                continue        ## a record cut in half by an interruption, the run is simply redone
+    return keys
+
+
+def sweep(seeds: list, sizes: list, ga_configs: list=None, output_path: str='runs.jsonl', workers: int=None, cache_dir: str=None) -> list:
+    '''
+    Runs every combination of seed, maze size and GA config that isn't in the output file yet.
+    Paramaters:
+        seeds list -- e.g. [42,43,44]
+        sizes list -- list of (width,height) e.g. [(40,20),(80,40)]
+        ga_configs list -- list of keyword arguments for 'GeneticAlgorithm', missing keys are taken from 'config.py'
+        output_path str -- JSON lines file the records are appended to
+        workers int -- number of worker processes, by default the number of CPUs
+        cache_dir str -- directory of a 'MazeCache' to reuse generated mazes across sweeps, None disables the cache
+    Returns:
+        records list -- records of the runs done in this call
+    '''
+    ga_configs = [{**DEFAULT_GA_CONFIG, **ga_config} for ga_config in (ga_configs or [{}])]
+    finished = load_finished_keys(output_path)
+    runs = [(seed, width, height, ga_config) for ga_config, (width, height), seed in itertools.product(ga_configs, sizes, seeds)
+            if run_key(seed, width, height, ga_config) not in finished]
+
+    records = []
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(output_path, 'a') as f:
+        futures = [executor.submit(run_single, *run, cache_dir=cache_dir) for run in runs]
+        for future in as_completed(futures):
+            record = future.result()
+            f.write(json.dumps(record) + '\n')
+            f.flush()                   ## every finished run is on disk, even if the sweep gets killed
+            records.append(record)
+    return records
+
+
+def _parse_seeds(values: list) -> list:
+    '''Parses seeds like ['42-52', '60'] into [42,43,...,52,60]'''
+    seeds = []
+    for value in values:
+        if '-' in value:
+            first, last = value.split('-')
+            seeds.extend(range(int(first), int(last)+1))
+        else:
+            seeds.append(int(value))
+    return seeds
+
+
+def _parse_size(value: str) -> tuple:
+    '''Parses a size like '40x20' into (40,20)'''
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Parallel multi-seed sweep of the genetic algorithm maze solver.")
+    parser.add_argument('--seeds', nargs='+', default=['42-52'], help="seeds or seed ranges, e.g. 42-52 60")
+    parser.add_argument('--sizes', nargs='+', default=[f"{cfg.MAZE_WIDTH}x{cfg.MAZE_HEIGHT}"], help="maze sizes, e.g. 40x20 80x40")
+    parser.add_argument('--generations', nargs='+', type=int, default=[cfg.GENERATIONS])
+    parser.add_argument('--population-sizes', nargs='+', type=int, default=[cfg.POPULATION_SIZE])
+    parser.add_argument('--mutation-rates', nargs='+', type=float, default=[cfg.MUTATION_RATE])
+    parser.add_argument('--elitism-rates', nargs='+', type=float, default=[cfg.ELITISM_RATE])
+    parser.add_argument('--fitness-modes', nargs='+', default=[cfg.FITNESS_MODE], help="e.g. euclidean maze_distance")
+    parser.add_argument('--selections', nargs='+', default=[cfg.SELECTION], help="e.g. weighted tournament sus truncation rank")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='runs.jsonl')
+    parser.add_argument('--cache', action='store_true', help=f"reuse generated mazes from the maze cache ('{cfg.CACHE_DIR}')")
+    args = parser.parse_args()
+
+    ga_configs = [
+        {'max_generations': generations, 'population_size': population_size, 'mutation_rate': mutation_rate, 'elitism_rate': elitism_rate, 'fitness_mode': fitness_mode, 'selection': selection}
+        for generations, population_size, mutation_rate, elitism_rate, fitness_mode, selection
+        in itertools.product(args.generations, args.population_sizes, args.mutation_rates, args.elitism_rates, args.fitness_modes, args.selections)
+    ]
+    records = sweep(_parse_seeds(args.seeds), [_parse_size(size) for size in args.sizes], ga_configs, output_path=args.output, workers=args.workers, cache_dir=cfg.CACHE_DIR if args.cache else None)
+
+    solved = sum(record['solved'] for record in records)
+    print(f"finished {len(records)} runs ({solved} solved), results in '{args.output}'")
@@ -0,0 +1,175 @@
+'''
+Reproducible benchmarks of maze generation, A*, the distance field, 'Player.walk' and 'GeneticAlgorithm.next_gen' (also with 'fill_dead_ends', where most players reach the exit).
+Every case uses fixed seeds and reports the best time out of '--repeat' runs (in seconds).
+
+Examples:
+    python benchmark.py --save-baseline                 ## record the baseline ('benchmark_baseline.json')
+    python benchmark.py                                 ## run again and flag cases slower than the baseline
+    python benchmark.py --sizes 40x20 200x200 --ga-sizes 40x20 --populations 100 1000
+'''
+
+## custom libs
+from maze import Maze
+from AStar import astar
+from player import Player
+from genetic_algorithm import GeneticAlgorithm
+import config as cfg
+
+## std libs
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+
+
+DEFAULT_SIZES = ['40x20', '200x200', '1000x1000', '2000x2000']
+DEFAULT_GA_SIZES = ['40x20', '80x40']
+DEFAULT_POPULATIONS = [100, 1000]
+SEED = 42
+WALKS = 100                     ## number of players walked in the 'walk' case
+
+
+def _best_time(function, repeat: int) -> float:
+    '''
+    Returns:
+        seconds float -- the fastest of 'repeat' runs of the function. The random module is reseeded before every run
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        random.seed(SEED)
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _generated_maze(width: int, height: int) -> Maze:
+    maze = Maze(width=width, height=height)
+    maze.generate_random_maze(seed_value=SEED, start=(1,1), end=(width-2, height-2))
+    return maze
+
+
+def run_benchmarks(sizes: list, ga_sizes: list, populations: list, repeat: int=3, generations: int=cfg.GENERATIONS) -> dict:
+    '''
+    Paramaters:
+        sizes list -- maze sizes (width,height) for generation, A*, distance field and walk cases
+        ga_sizes list -- maze sizes (width,height) for the GA cases
+        populations list -- population sizes for the GA cases
+        repeat int -- how many times each case is run
+        generations int -- 'max_generations' of the GA cases
+    Returns:
+        results dict -- case name to seconds, e.g. {'generate/40x20': 0.01,...}
+    '''
+    results = {}
+
+    def record(name: str, function):
+        results[name] = _best_time(function, repeat)
+        print(f"{name:<40} {results[name]:10.4f} s", flush=True)
+
+    for width, height in sizes:
+        size = f"{width}x{height}"
+        start, end = (1,1), (width-2, height-2)
+        record(f"generate/{size}", lambda: _generated_maze(width, height))
+
+        maze = _generated_maze(width, height)
+        record(f"astar/{size}", lambda: astar(maze, start, end))
+        record(f"evaluate_fields/{size}", lambda: maze.evaluate_fields(start, end))
+
+        def walk():
+            for _ in range(WALKS):
+                Player(start, end, maze, best_path=None).walk()
+        record(f"walk_x{WALKS}/{size}", walk)
+
+    for width, height in ga_sizes:
+        maze = _generated_maze(width, height)
+        for population_size in populations:
+            def next_gen():
+                gen_algo = GeneticAlgorithm(
+                    start_position=(1,1), end_position=(width-2, height-2), maze=maze, max_generations=generations,
+                    population_size=population_size, mutation_rate=cfg.MUTATION_RATE, elitism_rate=cfg.ELITISM_RATE
+                )
+                gen_algo.next_gen()
+            record(f"next_gen/{width}x{height}/population_{population_size}", next_gen)
+
+            def next_gen_fill_dead_ends():
+                filled_maze = Maze(width=width, height=height)
+                filled_maze.load_walls(maze.walls.copy())     ## 'fill_dead_ends' modifies the maze
+                gen_algo = GeneticAlgorithm(
+                    start_position=(1,1), end_position=(width-2, height-2), maze=filled_maze, max_generations=generations,
+                    population_size=population_size, mutation_rate=cfg.MUTATION_RATE, elitism_rate=cfg.ELITISM_RATE, fill_dead_ends=True
+                )
+                gen_algo.next_gen()
+            record(f"next_gen_filled/{width}x{height}/population_{population_size}", next_gen_fill_dead_ends)
+
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    '''
+    Paramaters:
+        results dict -- case name to seconds
+        baseline dict -- case name to seconds
+        tolerance float -- allowed slowdown, e.g. 0.1 allows cases to be 10% slower than the baseline
+    Returns:
+        regressions list -- list of (name, baseline_seconds, seconds) of the cases that are slower than allowed
+    '''
+    regressions = []
+    for name, seconds in results.items():
+        if name in baseline and seconds > baseline[name] * (1 + tolerance):
+            regressions.append((name, baseline[name], seconds))
+    return regressions
+
+
+def _parse_size(value: str) -> tuple:
+    '''Parses a size like '40x20' into (40,20)'''
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks of the maze solver.")
+    parser.add_argument('--sizes', nargs='*', default=DEFAULT_SIZES, help="maze sizes for the generation, A*, distance field and walk cases")
+    parser.add_argument('--ga-sizes', nargs='*', default=DEFAULT_GA_SIZES, help="maze sizes for the GA cases")
+    parser.add_argument('--populations', nargs='*', type=int, default=DEFAULT_POPULATIONS, help="population sizes for the GA cases")
+    parser.add_argument('--generations', type=int, default=cfg.GENERATIONS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark_results.json', help="file the results are written to")
+    parser.add_argument('--baseline', default='benchmark_baseline.json', help="results to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="write the results to the baseline file instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="allowed slowdown against the baseline, 0.1 = 10%%")
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        [_parse_size(size) for size in args.sizes], [_parse_size(size) for size in args.ga_sizes], args.populations,
+        repeat=args.repeat, generations=args.generations
+    )
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': SEED,
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+    output_path = args.baseline if args.save_baseline else args.output
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to '{output_path}'")
+    if args.save_baseline:
+        sys.exit(0)
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    except FileNotFoundError:
+        print(f"no baseline '{args.baseline}' to compare against, record one with --save-baseline")
+        sys.exit(0)
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name, baseline_seconds, seconds in regressions:
+        print(f"REGRESSION {name}: {baseline_seconds:.4f} s -> {seconds:.4f} s ({seconds/baseline_seconds - 1:+.0%})")
+    if not regressions:
+        print(f"no regressions against '{args.baseline}' (tolerance {args.tolerance:.0%})")
+    sys.exit(1 if regressions else 0)
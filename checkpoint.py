@@ -0,0 +1,167 @@
+'''
+Checkpoints of a running 'GeneticAlgorithm', so a killed run can be resumed exactly where it stopped.
+
+A checkpoint is a compressed NumPy '.npz' archive (written to a temporary file and renamed, so a kill never leaves a broken checkpoint):
+    meta     -- UTF-8 JSON: format version, algorithm parameters, generation counter, fitness history, restarts, state of the run's 'rng', maze size and hash
+    walls    -- the wall grid of the maze, bit-packed ('np.packbits'), so the maze doesn't have to be generated again
+    lengths  -- int32 path length of every individual
+    cells    -- int32 packed fields (x*height + y) of all paths, one after another
+    genome   -- uint8 direction codes of all paths, one after another
+    fitness, can_walk, is_dirty -- per individual
+The state of the run's random generator (and the NumPy generator state of the batch engine) is stored as well, so a resumed run continues bit-for-bit like the original one.
+Use 'GeneticAlgorithm(..., checkpoint_path=...)' to write checkpoints while running and 'GeneticAlgorithm.resume' to continue from one.
+'''
+
+## custom libs
+from maze import Maze
+from player import Player
+from batch_population import BatchPopulation
+
+## std libs
+import os
+import json
+import hashlib
+import tempfile
+from array import array
+
+## 3rd party libs
+import numpy as np
+
+
+CHECKPOINT_VERSION = 1
+PARAMETERS = ('max_generations', 'population_size', 'mutation_rate', 'min_fitness_difference', 'elitism_rate', 'engine', 'executor', 'workers', 'fitness_mode', 'stagnation_window', 'stagnation_metric', 'stagnation_action', 'selection', 'tournament_size')     ## constructor arguments stored in a checkpoint
+
+
+def walls_hash(walls) -> str:
+    '''
+    Returns:
+        hash str -- identifies a wall grid, used to check that a checkpoint is resumed on the right maze
+    '''
+    walls = np.ascontiguousarray(np.asarray(walls, dtype=np.uint8))
+    return hashlib.sha256(np.array(walls.shape, dtype=np.int64).tobytes() + walls.tobytes()).hexdigest()
+
+
+def save_checkpoint(gen_algo, path: str):
+    '''
+    Writes the state of the algorithm to a checkpoint file. Call it between generations.
+    Paramaters:
+        gen_algo GeneticAlgorithm
+        path str -- file path, replaced atomically
+    '''
+    maze = gen_algo.maze
+    version, internal_state, gauss_next = gen_algo.rng.getstate()
+    meta = {
+        'version': CHECKPOINT_VERSION,
+        'parameters': {name: getattr(gen_algo, name) for name in PARAMETERS},
+        'start_position': list(gen_algo.start_position),
+        'end_position': list(gen_algo.end_position),
+        'current_generation': gen_algo.current_generation,
+        'fitnesses': gen_algo.fitnesses,
+        'mean_fitnesses': gen_algo.mean_fitnesses,
+        'restarts': gen_algo.restarts,
+        'last_restart': gen_algo.last_restart,
+        'random_state': [version, list(internal_state), gauss_next],
+        'maze': {'width': maze.width, 'height': maze.height, 'walls_hash': walls_hash(maze.walls)},
+        'junction_keep': None if maze.junction_graph is None else [list(position) for position in maze.junction_graph.keep],
+    }
+
+    population = gen_algo.population
+    if gen_algo.engine == 'batch':
+        lengths = population.lengths.copy()
+        valid = np.arange(population.cells.shape[1])[None, :] < lengths[:, None]
+        cells = population.cells[valid]
+        genome = population.moves[np.arange(population.moves.shape[1])[None, :] < lengths[:, None] - 1]
+        fitness = population.fitness
+        can_walk = population.active
+        is_dirty = np.zeros(population.size, dtype=bool)
+        meta['rng_state'] = population.rng.bit_generator.state
+    else:
+        lengths = np.array([len(player.cells) for player in population], dtype=np.int32)
+        cells = np.frombuffer(b''.join(player.cells.tobytes() for player in population), dtype=np.int32)
+        genome = np.frombuffer(b''.join(player.genome.tobytes() for player in population), dtype=np.uint8)
+        fitness = np.array([player.fitness for player in population], dtype=np.float64)
+        can_walk = np.array([player.can_walk for player in population], dtype=bool)
+        is_dirty = np.array([player.is_dirty for player in population], dtype=bool)
+        meta['integer_fitness'] = [isinstance(player.fitness, int) for player in population]     ## restore ints as ints, so printed results match too
+
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-checkpoint-')
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            np.savez_compressed(
+                f, meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+                walls=np.packbits(np.asarray(maze.walls, dtype=np.uint8).ravel()),
+                lengths=lengths.astype(np.int32), cells=cells.astype(np.int32), genome=genome.astype(np.uint8),
+                fitness=fitness, can_walk=can_walk, is_dirty=is_dirty,
+            )
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_checkpoint(path: str, maze: Maze=None) -> dict:
+    '''
+    Reads a checkpoint file. 'GeneticAlgorithm.resume' builds the algorithm from it.
+    Paramaters:
+        path str -- file written by 'save_checkpoint'
+        maze Maze -- the maze of the run. By default it's rebuilt from the checkpoint, if given it must have the same walls
+    Returns:
+        state dict -- with 'parameters', 'start_position', 'end_position', 'maze', 'population', 'current_generation', 'fitnesses', 'mean_fitnesses', 'restarts', 'last_restart' and 'random_state'
+    '''
+    with np.load(path, allow_pickle=False) as archive:
+        meta = json.loads(archive['meta'].tobytes().decode())
+        if meta['version'] != CHECKPOINT_VERSION:
+            raise ValueError(f"'{path}' is checkpoint version {meta['version']}, only version {CHECKPOINT_VERSION} is supported")
+        width, height = meta['maze']['width'], meta['maze']['height']
+
+        if maze is None:
+            maze = Maze.from_walls(np.unpackbits(archive['walls'], count=width*height).reshape(width, height))
+        elif walls_hash(maze.walls) != meta['maze']['walls_hash']:
+            raise ValueError(f"The maze doesn't match the maze of the checkpoint '{path}'")
+        if meta['junction_keep'] is not None and maze.junction_graph is None:
+            maze.build_junction_graph(keep=[tuple(position) for position in meta['junction_keep']])
+
+        if meta['parameters']['fitness_mode'] == 'maze_distance' and not maze.has_distances(tuple(meta['end_position'])):
+            maze.evaluate_fields(start=tuple(meta['start_position']), end=tuple(meta['end_position']))      ## the batch engine reads the distance field when it's created
+
+        lengths = archive['lengths']
+        cells, genome = archive['cells'], archive['genome']
+        fitness, can_walk, is_dirty = archive['fitness'], archive['can_walk'], archive['is_dirty']
+
+    parameters = meta['parameters']
+    start, end = tuple(meta['start_position']), tuple(meta['end_position'])
+    cell_offsets = np.concatenate([[0], np.cumsum(lengths)]).tolist()
+    genome_offsets = np.concatenate([[0], np.cumsum(np.maximum(lengths - 1, 0))]).tolist()
+
+    if parameters['engine'] == 'batch':
+        population = BatchPopulation(start, end, maze, len(lengths), seed=0, fitness_mode=parameters['fitness_mode'])
+        population.import_individuals(np.arange(len(lengths)), [
+            (cells[cell_offsets[i]:cell_offsets[i+1]].tobytes(), genome[genome_offsets[i]:genome_offsets[i+1]].tobytes(), fitness[i], bool(can_walk[i]))
+            for i in range(len(lengths))
+        ])
+        population.rng.bit_generator.state = meta['rng_state']
+    else:
+        population = []
+        for i, integer_fitness in enumerate(meta['integer_fitness']):
+            player = Player(start, end, maze, best_path=None)
+            player.set_genome(array('i', cells[cell_offsets[i]:cell_offsets[i+1]].tobytes()), bytearray(genome[genome_offsets[i]:genome_offsets[i+1]].tobytes()))
+            player.fitness = int(fitness[i]) if integer_fitness else float(fitness[i])
+            player.can_walk = bool(can_walk[i])
+            player.is_dirty = bool(is_dirty[i])
+            population.append(player)
+
+    version, internal_state, gauss_next = meta['random_state']
+    return {
+        'parameters': parameters,
+        'start_position': start,
+        'end_position': end,
+        'maze': maze,
+        'population': population,
+        'current_generation': meta['current_generation'],
+        'fitnesses': meta['fitnesses'],
+        'mean_fitnesses': meta['mean_fitnesses'],
+        'restarts': meta['restarts'],
+        'last_restart': meta['last_restart'],
+        'random_state': (version, tuple(internal_state), gauss_next),
+    }
@@ -10,7 +10,18 @@ GENERATIONS = 50
 POPULATION_SIZE = 100
 MUTATION_RATE = 0.1
 ELITISM_RATE = 0.6
+SELECTION = 'weighted'                      ## 'weighted' (rank times a random number), 'tournament', 'sus', 'truncation' or 'rank' (see 'selection.py')
+TOURNAMENT_SIZE = 3                         ## individuals per tournament of the 'tournament' selection
+STAGNATION_WINDOW = None                    ## generations without improvement after which the run stagnates, None disables the check
+STAGNATION_METRIC = 'best'                  ## 'best' or 'mean' fitness is watched for stagnation
+STAGNATION_ACTION = 'stop'                  ## 'stop' ends a stagnating run, 'restart' restarts the population from the elites
+EVALUATION_CACHE_SIZE = None                ## entries of the cache of evaluated individuals (see 'evaluation_cache.py'), None disables it
+FILL_DEAD_ENDS = False                      ## wall up the dead ends of the maze before solving it (see 'Maze.fill_dead_ends')
+JUNCTION_GRAPH = False                      ## walk/mutate/search one junction at a time instead of one field at a time (see 'Maze.build_junction_graph')
+FITNESS_MODE = 'euclidean'                  ## 'euclidean', 'manhattan' or 'maze_distance' (walking distance to the end, see 'Player.evaluate')
 
 START_COORDS = (1,1)
 END_COORDS = (MAZE_WIDTH-2,MAZE_HEIGHT-2)
 
+CACHE_DIR = ".maze_cache"                   ## directory of the on-disk maze cache (see maze_cache.py)
+CACHE_MAX_BYTES = 1024**3                   ## the least recently used mazes are evicted when the cache grows over this size
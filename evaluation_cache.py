@@ -0,0 +1,98 @@
+## std libs
+import hashlib
+from collections import OrderedDict
+
+
+class EvaluationCache:
+    '''
+    Bounded LRU transposition table of evaluated individuals, keyed by a hash of the fitness mode and their path.
+    Only individuals that are done walking (dead end or exit) are stored: their fitness depends on nothing but the path,
+    so a clone or an individual that reached the same state again gets its fitness without being evaluated.
+    Individuals that still have to walk are never answered from the cache, their walk is random.
+    Paramaters:
+        max_entries int -- the least recently used entries are dropped above this size
+    '''
+
+    def __init__(self, max_entries: int=100_000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()           ## key -> fitness
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    @staticmethod
+    def key(player, fitness_mode: str) -> bytes:
+        '''
+        Paramaters:
+            player Player
+            fitness_mode str -- see 'Player.evaluate'. It's part of the key, so changing the mode mid-run never returns a fitness of the old mode
+        Returns:
+            key bytes -- 128 bit hash of the fitness mode and the packed path of the player (the path also fixes the genome)
+        '''
+        digest = hashlib.blake2b(fitness_mode.encode(), digest_size=16)
+        for buffer in player.cells.buffers():
+            digest.update(buffer)
+        return digest.digest()
+
+
+    def lookup(self, players: list, fitness_mode: str) -> list:
+        '''
+        Sets the fitness of every player that is done walking and is in the cache.
+        Paramaters:
+            players list -- dirty players
+            fitness_mode str -- mode the players are scored with
+        Returns:
+            remaining list -- players that still have to be evaluated, in the given order
+        '''
+        remaining = []
+        entries = self._entries
+        for player in players:
+            if player.can_walk:
+                remaining.append(player)
+                continue
+            key = self.key(player, fitness_mode)
+            fitness = entries.get(key)
+            if fitness is None:
+                self.misses += 1
+                remaining.append(player)
+                continue
+            entries.move_to_end(key)
+            self.hits += 1
+            player.fitness = fitness
+            player.is_dirty = False
+        return remaining
+
+
+    def store(self, players: list, fitness_mode: str):
+        '''
+        Adds the evaluated players that are done walking, scored with 'fitness_mode'.
+        '''
+        entries = self._entries
+        for player in players:
+            if player.can_walk:
+                continue
+            key = self.key(player, fitness_mode)
+            entries[key] = player.fitness
+            entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    @property
+    def hit_rate(self) -> float:
+        '''
+        Returns:
+            hit_rate float -- share of the lookups of finished individuals that were answered from the cache, 0 before the first lookup
+        '''
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+    def stats(self) -> dict:
+        return {'entries': len(self), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'hit_rate': self.hit_rate}
@@ -21,4 +21,75 @@ class Field():
         '''
         return self.is_wall()
 
-    
\ No newline at end of file
+    
+
+class FieldView(Field):
+    '''
+    'Field' compatible view of a single cell of a 'Maze' grid.
+    Reads and writes go straight through to the mazes 'walls' and 'distances' arrays, so no per cell state is kept here.
+    '''
+
+    def __init__(self, maze, x: int, y: int):
+        self._maze = maze                   ## the Maze object holding the arrays
+        self.position = (x,y)               ## set representing the 'x' and 'y' position of the field on the maze
+
+    @property
+    def _is_wall(self) -> bool:
+        return bool(self._maze.walls[self.position])
+
+    @_is_wall.setter
+    def _is_wall(self, value: bool):
+        self._maze.walls[self.position] = 1 if value else 0
+        self._maze.walls_changed()
+
+    @property
+    def fitness(self) -> int:
+        return int(self._maze.distances[self.position])
+
+    @fitness.setter
+    def fitness(self, value: int):
+        self._maze.distances[self.position] = value
+
+
+class FieldGrid():
+    '''
+    Old style 2D access (fields[x][y]) to the grid of a 'Maze'.
+    Every access creates a lightweight 'FieldView', so this should NOT be used on hot paths. Read 'Maze.walls' or 'Maze.wall_lookup' instead.
+    '''
+
+    def __init__(self, maze):
+        self._maze = maze
+
+    def __len__(self):
+        return self._maze.width
+
+    def __getitem__(self, x: int):
+        if not 0 <= x < self._maze.width:
+            raise IndexError(f"x={x} is out of bounds")
+        return FieldColumn(self._maze, x)
+
+    def __iter__(self):
+        for x in range(self._maze.width):
+            yield FieldColumn(self._maze, x)
+
+
+class FieldColumn():
+    '''
+    A single column (fixed 'x') of a 'FieldGrid'.
+    '''
+
+    def __init__(self, maze, x: int):
+        self._maze = maze
+        self._x = x
+
+    def __len__(self):
+        return self._maze.height
+
+    def __getitem__(self, y: int) -> FieldView:
+        if not 0 <= y < self._maze.height:
+            raise IndexError(f"y={y} is out of bounds")
+        return FieldView(self._maze, self._x, y)
+
+    def __iter__(self):
+        for y in range(self._maze.height):
+            yield FieldView(self._maze, self._x, y)
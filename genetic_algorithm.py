@@ -2,15 +2,124 @@
 from field import Field
 from maze import Maze
 from AStar import astar
-from player import Player
+from player import Player, FITNESS_MODES
+from batch_population import BatchPopulation
+from parallel_evaluation import ParallelEvaluator
+from checkpoint import save_checkpoint, load_checkpoint
+from evaluation_cache import EvaluationCache
+from selection import SELECTIONS, select_parents, elite_ids
+import config as cfg
 
 ## std lib
 import random
+import time
+from array import array
+
+## 3rd party libs
+import numpy as np
+
+
+class GenerationSnapshot:
+    '''
+    State of a 'GeneticAlgorithm' run after a generation, yielded by 'GeneticAlgorithm.run_generations' and passed to 'on_generation'.
+        generation   -- generation number
+        best_fitness -- best fitness of the population
+        mean_fitness -- mean fitness of the population
+        seconds      -- time the generation took
+        elapsed      -- time since the run (this call of 'run_generations'/'next_gen') started
+        best_path    -- path of the best individual, only built when it's read
+    '''
+    __slots__ = ('generation', 'best_fitness', 'mean_fitness', 'seconds', 'elapsed', '_best_cells', '_height')
+
+    def __init__(self, generation: int, best_fitness: float, mean_fitness: float, best_cells: array, height: int, seconds: float, elapsed: float):
+        self.generation = generation
+        self.best_fitness = best_fitness
+        self.mean_fitness = mean_fitness
+        self.seconds = seconds
+        self.elapsed = elapsed
+        self._best_cells = best_cells       ## packed fields of the best path (copy)
+        self._height = height
+
+    @property
+    def best_path(self) -> list:
+        height = self._height
+        return [divmod(cell, height) for cell in self._best_cells]
+
+    def to_dict(self) -> dict:
+        '''
+        Returns:
+            snapshot dict -- JSON friendly version of the snapshot (the path as a list of [x,y])
+        '''
+        return {
+            'generation': self.generation, 'best_fitness': self.best_fitness, 'mean_fitness': self.mean_fitness,
+            'seconds': self.seconds, 'elapsed': self.elapsed, 'best_path': [list(position) for position in self.best_path],
+        }
+
+    def __repr__(self):
+        return f"GenerationSnapshot(generation={self.generation}, best_fitness={self.best_fitness}, mean_fitness={self.mean_fitness:.3f}, seconds={self.seconds:.4f})"
+
 
 class GeneticAlgorithm:
     is_end = False          ## is the problem solved, if True then quit
     bestPlayer = None
-    def __init__(self, start_position: set, end_position: set, maze: Maze,  max_generations: int=50, population_size: int=100, mutation_rate: float=0.01, min_fitness_difference: float=0.1, elitism_rate: float=0.4,best_path: list=[] ):
+    def __init__(self, start_position: set, end_position: set, maze: Maze,  max_generations: int=50, population_size: int=100, mutation_rate: float=0.01, min_fitness_difference: float=0.1, elitism_rate: float=0.4,best_path: list=[], engine: str='object', executor: str=None, workers: int=None, profiler=None, fitness_mode: str=cfg.FITNESS_MODE, fill_dead_ends: bool=cfg.FILL_DEAD_ENDS, junction_graph: bool=cfg.JUNCTION_GRAPH, checkpoint_path: str=None, checkpoint_interval: int=10, initial_population=None, on_generation=None, stagnation_window: int=cfg.STAGNATION_WINDOW, stagnation_metric: str=cfg.STAGNATION_METRIC, stagnation_action: str=cfg.STAGNATION_ACTION, evaluation_cache_size: int=cfg.EVALUATION_CACHE_SIZE, selection: str=cfg.SELECTION, tournament_size: int=cfg.TOURNAMENT_SIZE, rng: random.Random=None ):
+        '''
+        Paramaters:
+            best_path list -- A* path from the start to the end if it's already known (e.g. from a 'MazeCache'), by default it's searched
+            engine str -- 'object' keeps the population as a list of 'Player' objects, 'batch' stores it in a 'BatchPopulation' (NumPy arrays) which scales to much bigger populations
+            executor str -- None evaluates the population serially, 'process' or 'thread' evaluates it on a pool of workers (see 'ParallelEvaluator'). Only for the 'object' engine
+            workers int -- number of pool workers, by default the number of CPUs
+            profiler GenerationProfiler -- records per generation timings and counters, None disables the instrumentation
+            fitness_mode str -- 'euclidean', 'manhattan' or 'maze_distance' (walking distance to the end from the maze's distance field), by default 'config.FITNESS_MODE'
+            fill_dead_ends bool -- wall up the dead ends of the maze first ('Maze.fill_dead_ends'), the maze object is modified
+            junction_graph bool -- build the junction graph of the maze ('Maze.build_junction_graph') so players walk and mutate one junction at a time. Only for the 'object' engine, the batch engine walks the fields either way
+            checkpoint_path str -- write a checkpoint ('checkpoint.py') to this file every 'checkpoint_interval' generations and at the end of the run, None disables checkpoints
+            checkpoint_interval int -- generations between checkpoints
+            initial_population list -- start from this population ('Player' list, or 'BatchPopulation' for the batch engine) instead of a random one
+            on_generation callable -- called as 'on_generation(gen_algo, snapshot)' after every generation with a 'GenerationSnapshot'. It may change parameters of the algorithm, returning True stops the run
+            stagnation_window int -- the run stagnates when the fitness didn't improve by more than 'min_fitness_difference' in this many generations, None disables the check
+            stagnation_metric str -- 'best' or 'mean' fitness of the population is watched for stagnation
+            stagnation_action str -- what to do on stagnation, 'stop' ends the run, 'restart' keeps the elites and replaces the rest of the population with new individuals seeded from them (see 'restart_population')
+            evaluation_cache_size int -- size of an 'EvaluationCache' that answers evaluations of clones and repeated individuals, None disables the cache. Only for the 'object' engine
+            selection str -- how parents are picked, 'weighted' (the original rank weighted scheme), 'tournament', 'sus', 'truncation' or 'rank' (see 'selection.py')
+            tournament_size int -- individuals per tournament of the 'tournament' selection
+            rng random.Random -- generator every random draw of the run comes from (the players, the NumPy generators of the batch engine and of the selection operators
+                                 and the seeds of the parallel workers are drawn from it), so runs in parallel threads or processes are reproducible.
+                                 By default the global 'random' module, which keeps the results of scripts that seed it
+        '''
+        if engine not in ('object', 'batch'):
+            raise ValueError(f"Unknown engine '{engine}', expected 'object' or 'batch'")
+        if executor is not None and engine != 'object':
+            raise ValueError("A parallel executor is only supported with the 'object' engine")
+        if evaluation_cache_size is not None and engine != 'object':
+            raise ValueError("The evaluation cache is only supported with the 'object' engine")
+        if stagnation_metric not in ('best', 'mean'):
+            raise ValueError(f"Unknown stagnation metric '{stagnation_metric}', expected 'best' or 'mean'")
+        if stagnation_action not in ('stop', 'restart'):
+            raise ValueError(f"Unknown stagnation action '{stagnation_action}', expected 'stop' or 'restart'")
+        if selection not in SELECTIONS:
+            raise ValueError(f"Unknown selection '{selection}', expected one of {SELECTIONS}")
+        if tournament_size < 1:
+            raise ValueError("'tournament_size' must be at least 1")
+        self.rng = random if rng is None else rng
+        self.selection = selection
+        self.tournament_size = tournament_size
+        self.fitness_mode = fitness_mode                        ## property, checked by its setter
+        self.engine = engine
+        self.executor = executor
+        self.workers = workers
+        self._evaluator = None                                  ## ParallelEvaluator, created on the first evaluation
+        self.evaluation_cache = None if evaluation_cache_size is None else EvaluationCache(evaluation_cache_size)
+        self.profiler = profiler                                ## GenerationProfiler or None
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.on_generation = on_generation
+        self.stop_requested = False                             ## set by 'stop', ends the running 'run_generations' call. Not stored in checkpoints
+        self.stagnation_window = stagnation_window
+        self.stagnation_metric = stagnation_metric
+        self.stagnation_action = stagnation_action
+        self.restarts = 0                                       ## number of population restarts
+        self.last_restart = 0                                   ## generation of the last restart, the stagnation window starts there
         self.population = []
         self.best_path = best_path
         self.maze = maze
@@ -19,6 +128,7 @@ class GeneticAlgorithm:
 
         self.min_fitness_difference = min_fitness_difference    ## epsilon. If the fitness between the previous and current generation is less than this then stop the algorithm
         self.fitnesses = [999999999]                            ## save the fitness value for each generation here
+        self.mean_fitnesses = []                                ## mean fitness of the population after each generation
 
         self.population_size = population_size                  ## 
         self.mutation_rate = mutation_rate                      ## 
@@ -28,16 +138,104 @@ class GeneticAlgorithm:
         self.end_position = end_position                        ## ending coordinates in the maze. e.g (1,1) or (3,4)...
 
 
-        self.best_path = astar(maze= maze, start= start_position, end= end_position)  ## get the best path
-        self.init_population(start=start_position, end=end_position, maze=maze)
+        if fill_dead_ends:
+            maze.fill_dead_ends(keep=[start_position, end_position])
+        if junction_graph:
+            maze.build_junction_graph(keep=[start_position, end_position])
+        if not best_path:
+            self.best_path = astar(maze= maze, start= start_position, end= end_position)  ## get the best path, unless one was passed in (e.g. from a 'MazeCache')
+        if fitness_mode == 'maze_distance' and not maze.has_distances(end_position):
+            maze.evaluate_fields(start=start_position, end=end_position)    ## distance field the players are scored with, computed once per run
+        if initial_population is None:
+            self.init_population(start=start_position, end=end_position, maze=maze)
+        else:
+            self.population = initial_population
+            if engine == 'batch':
+                self.population.profiler = self.profiler
+            else:
+                for player in self.population:
+                    player.profiler = self.profiler
+
+
+    @property
+    def fitness_mode(self) -> str:
+        return self._fitness_mode
+
+    @fitness_mode.setter
+    def fitness_mode(self, fitness_mode: str):
+        '''
+        Can be changed mid-run (e.g. from 'on_generation'). The whole population is then re-scored with the new mode in the next evaluation,
+        so scores of the old and the new mode are never compared. Switching to 'maze_distance' computes the distance field if the maze has none.
+        '''
+        if fitness_mode not in FITNESS_MODES:
+            raise ValueError(f"Unknown fitness mode '{fitness_mode}', expected one of {FITNESS_MODES}")
+        changed = hasattr(self, '_fitness_mode') and fitness_mode != self._fitness_mode       ## the constructor sets it before the population exists
+        self._fitness_mode = fitness_mode
+        if not changed:
+            return
+        if fitness_mode == 'maze_distance' and not self.maze.has_distances(self.end_position):
+            self.maze.evaluate_fields(start=self.start_position, end=self.end_position)
+        if self.engine == 'batch':
+            self.population.set_fitness_mode(fitness_mode)
+            return
+        for player in self.population:
+            player.is_dirty = True
+        if self._evaluator is not None:
+            self._evaluator.close()         ## the workers score with the old mode, a new evaluator is made on the next evaluation
+            self._evaluator = None
+
+
+    @classmethod
+    def resume(cls, path: str, maze: Maze=None, **parameters):
+        '''
+        Continues a run from a checkpoint written with 'checkpoint_path'. Calling 'next_gen' on it gives the same results as the original run would have.
+        Paramaters:
+            path str -- checkpoint file
+            maze Maze -- the maze of the run, by default the one stored in the checkpoint
+            parameters -- constructor arguments to set, e.g. checkpoint_path, profiler or a higher max_generations. The stored ones are used for the rest.
+                          The stored random state is loaded into 'rng' (the global 'random' module by default)
+        Returns:
+            gen_algo GeneticAlgorithm
+        '''
+        state = load_checkpoint(path, maze)
+        gen_algo = cls(
+            start_position=state['start_position'], end_position=state['end_position'], maze=state['maze'],
+            initial_population=state['population'], **{**state['parameters'], **parameters}
+        )
+        if gen_algo.engine == 'object':
+            for player in gen_algo.population:
+                player.best_path = gen_algo.best_path
+                player.rng = gen_algo.rng
+        gen_algo.current_generation = state['current_generation']
+        gen_algo.fitnesses = state['fitnesses']
+        gen_algo.mean_fitnesses = state['mean_fitnesses']
+        gen_algo.restarts = state['restarts']
+        gen_algo.last_restart = state['last_restart']
+        gen_algo.rng.setstate(state['random_state'])
+        return gen_algo
+
+
+    def save_checkpoint(self, path: str=None):
+        '''
+        Writes a checkpoint of the run, see 'checkpoint.py'.
+        Paramaters:
+            path str -- by default 'checkpoint_path'
+        '''
+        save_checkpoint(self, self.checkpoint_path if path is None else path)
 
 
     def init_population(self,start: set, end: set, maze: Maze):
         '''
         Sets the initial population.
         '''
+        if self.engine == 'batch':
+            self.population = BatchPopulation(start, end, maze, self.population_size, seed=self.rng.getrandbits(64), fitness_mode=self.fitness_mode)
+            self.population.profiler = self.profiler
+            self.population.evaluate()
+            return
+
         for i in range(self.population_size):
-            self.population.append(Player(start, end, maze, self.best_path))
+            self.population.append(Player(start, end, maze, self.best_path, rng=self.rng, profiler=self.profiler))
         
         # for i in range(self.population_size//2):
         #     self.population.append(Player(start, end, maze, self.best_path))
@@ -47,38 +245,100 @@ class GeneticAlgorithm:
 
 
     def get_max_fitness(self):
+        if self.engine == 'batch':
+            return float(self.population.fitness.max())
         return max(map(lambda x: x.fitness,self.population))
     
     def get_min_fitness(self):
+        if self.engine == 'batch':
+            return float(self.population.fitness.min())
         return min(map(lambda x: x.fitness,self.population))
 
 
     def _evaluate_population(self):
         '''
         Evaluates/updates the fitness value of all players in the population.
+        Only players whose path changed since their last evaluation (new children, mutated players) are walked and scored, the rest keep their cached fitness.
         '''
-        for player in self.population:
-            player.evaluate(fields=self.maze.fields)        ## optional fields
-
+        if self.engine == 'batch':
+            self.population.evaluate()
+            return
+        dirty = [player for player in self.population if player.is_dirty]
+        if self.evaluation_cache is not None:
+            hits, misses = self.evaluation_cache.hits, self.evaluation_cache.misses
+            dirty = self.evaluation_cache.lookup(dirty, self.fitness_mode)
+            if self.profiler is not None:
+                self.profiler.count('cache_hits', self.evaluation_cache.hits - hits)
+                self.profiler.count('cache_misses', self.evaluation_cache.misses - misses)
+        if self.executor is not None:
+            if self._evaluator is None:
+                self._evaluator = ParallelEvaluator(self.maze, mode=self.executor, workers=self.workers, fitness_mode=self.fitness_mode, rng=self.rng)
+            self._evaluator.evaluate(dirty)
+        else:
+            for player in dirty:
+                player.evaluate(fitness_mode=self.fitness_mode)
+        if self.evaluation_cache is not None:
+            self.evaluation_cache.store(dirty, self.fitness_mode)
+
+
+    def _mean_fitness(self) -> float:
+        if self.engine == 'batch':
+            return float(self.population.fitness.mean())
+        return sum(player.fitness for player in self.population) / len(self.population)
 
     def _fitness(self):
         return self.get_min_fitness()
 
     def get_best_path(self):
+        if self.engine == 'batch':
+            return self.population.get_best_path()
         return min(self.population,key=lambda player: player.fitness).path
 
     def _selection(self):
+        if self.engine == 'batch':
+            self.population.selection(self.elitism_rate, self.selection, self.tournament_size)
+            return
+        if self.selection != 'weighted':
+            self._operator_selection()
+            return
 
         ## sort the population by fitness in ascending order
         ## NOTE: fitness is the distance so the lower it is the better
         self.population = sorted(self.population,key=lambda player: player.fitness) 
 
         ## every players chance to be selected
-        selection_chance = [ (self.population_size - id) * random.random() for id in range(self.population_size)]
+        selection_chance = [ (self.population_size - id) * self.rng.random() for id in range(self.population_size)]
         selected_count = int((1-self.elitism_rate) * len(self.population))
-        selected = random.choices(self.population, weights=selection_chance, k=selected_count) 
+        selected = self.rng.choices(self.population, weights=selection_chance, k=selected_count) 
 
         ## cross the selected players
+        children = self._crossover(selected)
+        
+        ## remove the worst in the population and then add the children
+        elites = max(len(self.population) - len(children), 0)       ## how many elites are staying
+        self.population = self.population[:elites]
+        self.population += children
+
+
+    def _operator_selection(self):
+        '''
+        Selection with one of the linear time operators of 'selection.py'. The elites are found with a partial selection, the population isn't sorted.
+        '''
+        fitness = np.fromiter((player.fitness for player in self.population), dtype=np.float64, count=len(self.population))
+        selected_count = int((1-self.elitism_rate) * len(self.population)) // 2 * 2
+        rng = np.random.default_rng(self.rng.getrandbits(64))       ## seeded from 'rng', so runs stay reproducible
+        parents = select_parents(self.selection, fitness, selected_count, rng, self.tournament_size)
+        children = self._crossover([self.population[id] for id in parents.tolist()])
+        elites = elite_ids(fitness, len(self.population) - len(children))
+        self.population = [self.population[id] for id in elites.tolist()] + children
+
+
+    def _crossover(self, selected: list) -> list:
+        '''
+        Crosses consecutive pairs of the selected players.
+        Returns:
+            children list
+        '''
         children = []
         for i in range(0,len(selected),2):
             if i+1 > len(selected):
@@ -87,49 +347,208 @@ class GeneticAlgorithm:
             child1,child2 = selected[i].crossover_random(selected[i+1])
             children.append(child1)
             children.append(child2)
-        
-        ## remove the worst in the population and then add the children
-        elites = max(len(self.population) - len(children), 0)       ## how many elites are staying
-        self.population = self.population[:elites]
-        self.population += children
+        if self.profiler is not None:
+            self.profiler.count('crossovers', len(children)//2)
+        return children
         
         
 
     def _mutation(self):
+        if self.engine == 'batch':
+            self.population.mutation(self.mutation_rate)
+            return
         for p in self.population:
-            if random.random() <= self.mutation_rate:
+            if self.rng.random() <= self.mutation_rate:
                 p.mutate()
+                if self.profiler is not None:
+                    self.profiler.count('mutations')
 
 
     def is_termination_condition_satisfied(self):
+        if self.stop_requested:
+            return True
         if self.current_generation >= self.max_generations:  ## too many generations
             return True
         if self.fitnesses[-1] == 0: ## reached the end
             return True
-        # if abs(self.fitnesses[self.current_generation] - self.fitnesses[self.current_generation-1]) < self.min_fitness_difference:
-        #     return True
+        if self.stagnation_action == 'stop' and self.is_stagnating():
+            return True
 
 
-    def next_gen(self):
-        
-        while not self.is_termination_condition_satisfied():
-            self.current_generation += 1
+    def is_stagnating(self) -> bool:
+        '''
+        Did the watched fitness ('stagnation_metric') improve by less than 'min_fitness_difference' over the last 'stagnation_window' generations (since the last restart).
+        '''
+        if self.stagnation_window is None or self.current_generation - self.last_restart < self.stagnation_window:
+            return False
+        history = self.fitnesses if self.stagnation_metric == 'best' else self.mean_fitnesses
+        if len(history) <= self.stagnation_window:
+            return False
+        return history[-1-self.stagnation_window] - history[-1] < self.min_fitness_difference      ## the lower the better
+
 
-            ## update the population fitness values
-            self._evaluate_population()
+    def restart_population(self):
+        '''
+        Partial restart: the elites ('elitism_rate' of the population, at least one) stay and every other individual is replaced by a new one.
+        A new individual starts with a random part (from the start) of the path of a random elite and walks on at random, a cut at the start makes it a completely new random walker.
+        '''
+        self.restarts += 1
+        self.last_restart = self.current_generation
+        elite_count = max(int(self.elitism_rate * self.population_size), 1)
+        if self.engine == 'batch':
+            self.population.restart(elite_count)
+            return
+
+        ranked = sorted(self.population, key=lambda player: player.fitness)
+        elites = ranked[:elite_count]
+        children = []
+        for _ in range(len(ranked) - len(elites)):
+            parent = self.rng.choice(elites)
+            cut = self.rng.randint(1, len(parent.cells))
+            child = Player(start=parent.start, end=parent.end, maze=parent.maze, best_path=parent.best_path, rng=self.rng, profiler=self.profiler)
+            child.set_genome(parent.cells[:cut], parent.genome[:cut-1])
+            children.append(child)
+        self.population = elites + children
 
-            #select and crossover
-            self._selection()
 
-            #mutation with certain probability
-            self._mutation()
+    def close(self):
+        '''
+        Shuts down the parallel evaluator, if there is one.
+        '''
+        if self._evaluator is not None:
+            self._evaluator.close()
+            self._evaluator = None
 
-            # update fitness values for each path
-            self._evaluate_population()
-            self.fitnesses.append(self._fitness())
 
-            
+    def get_migrants(self, count: int) -> list:
+        '''
+        Copies of the best individuals, to send to another population (see 'island_model.py').
+        Paramaters:
+            count int -- number of individuals
+        Returns:
+            migrants list -- list of (cells, genome, fitness, can_walk) from the best to the worst. cells are the packed fields as int32 bytes, genome the direction codes as bytes
+        '''
+        if self.engine == 'batch':
+            return self.population.export_individuals(self.population.ranking()[:count])
+        best = sorted(self.population, key=lambda player: player.fitness)[:count]
+        return [(player.cells.tobytes(), player.genome.tobytes(), player.fitness, player.can_walk) for player in best]
 
 
+    def add_migrants(self, migrants: list):
+        '''
+        Replaces the worst individuals of the population with the migrants.
+        Paramaters:
+            migrants list -- individuals returned by 'get_migrants' of an algorithm on the same maze
+        '''
+        if len(migrants) <= 0:
+            return
+        if self.engine == 'batch':
+            self.population.import_individuals(self.population.ranking()[-len(migrants):], migrants)
+            return
+
+        self.population = sorted(self.population, key=lambda player: player.fitness)[:max(len(self.population) - len(migrants), 0)]
+        for cells, genome, fitness, can_walk in migrants:
+            player = Player(self.start_position, self.end_position, self.maze, self.best_path, rng=self.rng, profiler=self.profiler)
+            player.set_genome(array('i', cells), bytearray(genome))
+            player.fitness = fitness
+            player.can_walk = can_walk
+            player.is_dirty = False
+            self.population.append(player)
+
+
+    def next_gen(self, generations: int=None):
+        '''
+        Runs the algorithm until a termination condition is satisfied.
+        Paramaters:
+            generations int -- stop after this many generations at the latest, calling 'next_gen' again continues the run
+        '''
+        for _ in self.run_generations(generations):
+            pass
 
 
+    def run_generations(self, generations: int=None):
+        '''
+        Same as 'next_gen' but it's a generator that yields a 'GenerationSnapshot' after every generation.
+        The next generation only runs when the next snapshot is requested, so the caller can stream progress, change parameters (e.g. 'mutation_rate') or stop by breaking out of the loop.
+        Paramaters:
+            generations int -- stop after this many generations at the latest
+        Yields:
+            snapshot GenerationSnapshot
+        '''
+        self.stop_requested = False                 ## a stop only ends the call it was requested in, a later call continues the run
+        started = time.perf_counter()
+        last_generation = None if generations is None else self.current_generation + generations
+        try:
+            while not self.is_termination_condition_satisfied() and self.current_generation != last_generation:
+                generation_started = time.perf_counter()
+                self._run_generation()
+                finished = time.perf_counter()
+
+                snapshot = self._snapshot(finished - generation_started, finished - started)
+                if self.on_generation is not None and self.on_generation(self, snapshot):
+                    self.stop()
+                if self.checkpoint_path is not None and (self.current_generation % self.checkpoint_interval == 0 or self.is_termination_condition_satisfied()):
+                    self.save_checkpoint()
+                yield snapshot
+        finally:
+            self.close()
+
+
+    def stop(self):
+        '''
+        Ends the run after the current generation, 'is_termination_condition_satisfied' is True until the next 'next_gen'/'run_generations' call continues the run.
+        '''
+        self.stop_requested = True
+
+
+    def _snapshot(self, seconds: float, elapsed: float) -> 'GenerationSnapshot':
+        '''
+        Returns:
+            snapshot GenerationSnapshot -- state of the generation that just finished
+        '''
+        if self.engine == 'batch':
+            best = int(np.argmin(self.population.fitness))
+            best_cells = array('i', self.population.cells[best, :self.population.lengths[best]].tobytes())
+        else:
+            best_cells = min(self.population, key=lambda player: player.fitness).cells.to_array()
+        return GenerationSnapshot(self.current_generation, self.fitnesses[-1], self.mean_fitnesses[-1], best_cells, self.maze.height, seconds, elapsed)
+
+
+    def _run_phase(self, phase: str, method):
+        '''
+        Runs the method and adds its duration to the phase in the profiler (if there is one).
+        '''
+        if self.profiler is None:
+            method()
+            return
+        started = time.perf_counter()
+        method()
+        self.profiler.add_time(phase, time.perf_counter() - started)
+
+
+    def _run_generation(self):
+        '''
+        Runs one generation: evaluate, selection and crossover, mutation, evaluate.
+        '''
+        self.current_generation += 1
+        if self.profiler is not None:
+            self.profiler.start_generation(self.current_generation)
+
+        ## update the population fitness values
+        self._run_phase('evaluate', self._evaluate_population)
+
+        #select and crossover
+        self._run_phase('selection', self._selection)
+
+        #mutation with certain probability
+        self._run_phase('mutation', self._mutation)
+
+        # update fitness values for each path
+        self._run_phase('evaluate', self._evaluate_population)
+        self.fitnesses.append(self._fitness())
+        self.mean_fitnesses.append(self._mean_fitness())
+        if self.profiler is not None:
+            self.profiler.end_generation(self.fitnesses[-1])
+        if self.stagnation_action == 'restart' and self.fitnesses[-1] != 0 and self.is_stagnating():
+            self.restart_population()
+
@@ -0,0 +1,221 @@
+'''
+Island model: several independent 'GeneticAlgorithm' populations (islands), each in its own worker process.
+Every 'migration_interval' generations the best individuals of every island migrate to its neighbors and replace their worst individuals.
+The run stops at the first migration point where any island has reached the end (fitness 0), or when all islands are done.
+
+Example:
+    python island_model.py --seed 42 --islands 4 --migration-interval 5 --topology ring
+'''
+
+## custom libs
+from maze import Maze
+import config as cfg
+
+## std libs
+import os
+import random
+import argparse
+import multiprocessing
+
+## 3rd party libs
+import numpy as np
+
+
+TOPOLOGIES = ('ring', 'all')
+
+
+def migration_targets(topology: str, island: int, islands: int) -> list:
+    '''
+    Paramaters:
+        topology str -- 'ring' sends migrants to the next island, 'all' to every other island
+        island int -- id of the sending island
+        islands int -- number of islands
+    Returns:
+        targets list -- ids of the islands that receive the migrants
+    '''
+    if islands <= 1:
+        return []
+    if topology == 'ring':
+        return [(island + 1) % islands]
+    return [target for target in range(islands) if target != island]
+
+
+def island_seeds(seed: int, islands: int) -> list:
+    '''
+    Paramaters:
+        seed int -- seed of the island model
+        islands int -- number of islands
+    Returns:
+        seeds list -- one 128 bit seed per island, from independent substreams spawned off 'np.random.SeedSequence(seed)'
+    '''
+    return [int.from_bytes(child.generate_state(4).tobytes(), 'little') for child in np.random.SeedSequence(seed).spawn(islands)]
+
+
+def _island_worker(connection, walls: np.ndarray, start: set, end: set, ga_config: dict, seed: int):
+    '''
+    Runs one island. Answers commands from the 'IslandModel' until it's told to stop:
+        ('run', generations, migration_size) -> (generation, best fitness, migrants, done)
+        ('migrate', migrants)                -> None
+        ('best_path',)                       -> best path
+        ('fitnesses',)                       -> fitness of every generation
+        ('stop',)
+    '''
+    ## imported here so the worker builds its own algorithm in its own process
+    from genetic_algorithm import GeneticAlgorithm
+
+    maze = Maze.from_walls(walls)
+    gen_algo = GeneticAlgorithm(start_position=start, end_position=end, maze=maze, rng=random.Random(seed), **ga_config)
+    try:
+        while True:
+            command = connection.recv()
+            if command[0] == 'run':
+                _, generations, migration_size = command
+                gen_algo.next_gen(generations=generations)
+                done = bool(gen_algo.is_termination_condition_satisfied())
+                connection.send((gen_algo.current_generation, gen_algo.fitnesses[-1], gen_algo.get_migrants(migration_size), done))
+            elif command[0] == 'migrate':
+                gen_algo.add_migrants(command[1])
+                connection.send(None)
+            elif command[0] == 'best_path':
+                connection.send(gen_algo.get_best_path())
+            elif command[0] == 'fitnesses':
+                connection.send(gen_algo.fitnesses)
+            else:
+                break
+    finally:
+        gen_algo.close()
+        connection.close()
+
+
+class IslandModel:
+    '''
+    Runs 'islands' populations of the genetic algorithm on the same maze in parallel, with migration between them.
+    The islands run in lockstep (they only talk at migrations) and every island draws from its own 'random.Random', seeded from a substream spawned off 'seed'
+    (see 'island_seeds'), so a run is reproducible.
+    Paramaters:
+        maze Maze -- the maze, its wall grid is copied to every worker
+        start_position set -- e.g. (1,1)
+        end_position set -- e.g. (38,18)
+        islands int -- number of islands (worker processes), by default the number of CPUs
+        migration_interval int -- generations between migrations
+        migration_size int -- how many of its best individuals an island sends to each of its targets
+        topology str -- 'ring' or 'all' (all-to-all), see 'migration_targets'
+        seed int -- seed of the run, the islands' seeds are spawned from it
+        ga_config dict -- keyword arguments for every island's 'GeneticAlgorithm' e.g. {'population_size': 100}
+    '''
+
+    def __init__(self, maze: Maze, start_position: set, end_position: set, islands: int=None, migration_interval: int=5, migration_size: int=2, topology: str='ring', seed: int=42, ga_config: dict=None):
+        if topology not in TOPOLOGIES:
+            raise ValueError(f"Unknown topology '{topology}', expected one of {TOPOLOGIES}")
+        if migration_interval < 1:
+            raise ValueError("'migration_interval' must be at least 1")
+        self.maze = maze
+        self.start_position = start_position
+        self.end_position = end_position
+        self.islands = islands or os.cpu_count() or 1
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+        self.topology = topology
+        self.seed = seed
+        self.ga_config = dict(ga_config or {})
+
+        self.current_generation = 0             ## generations run by the islands
+        self.best_fitnesses = []                ## best fitness of every island after the last migration epoch
+        self.solved_island = None               ## id of the island that reached the end first, None if no island did
+        self.best_island = None                 ## id of the island with the best fitness
+        self.best_path = None                   ## best path of the best island
+        self.fitnesses = []                     ## fitness of every generation, one list per island
+
+
+    def run(self) -> float:
+        '''
+        Runs the islands until one reaches the end or all of them are done.
+        Returns:
+            best_fitness float -- best fitness over all islands
+        '''
+        walls = np.ascontiguousarray(np.asarray(self.maze.walls, dtype=np.uint8))
+        connections, processes = [], []
+        seeds = island_seeds(self.seed, self.islands)
+        for island in range(self.islands):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_island_worker, daemon=True,
+                args=(worker_connection, walls, self.start_position, self.end_position, self.ga_config, seeds[island])
+            )
+            process.start()
+            worker_connection.close()
+            connections.append(connection)
+            processes.append(process)
+
+        try:
+            while True:
+                for connection in connections:
+                    connection.send(('run', self.migration_interval, self.migration_size))
+                results = [connection.recv() for connection in connections]
+                self.current_generation = max(generation for generation, _, _, _ in results)
+                self.best_fitnesses = [fitness for _, fitness, _, _ in results]
+                self.best_island = min(range(self.islands), key=lambda island: self.best_fitnesses[island])
+
+                solved = [island for island in range(self.islands) if self.best_fitnesses[island] == 0]
+                if solved:
+                    self.solved_island = solved[0]
+                    break
+                if all(done for _, _, _, done in results):
+                    break
+
+                ## migration, every island gets the migrants of the islands that target it
+                incoming = [[] for _ in range(self.islands)]
+                for island, (_, _, migrants, _) in enumerate(results):
+                    for target in migration_targets(self.topology, island, self.islands):
+                        incoming[target].extend(migrants)
+                for connection, migrants in zip(connections, incoming):
+                    connection.send(('migrate', migrants))
+                for connection in connections:
+                    connection.recv()
+
+            connections[self.best_island].send(('best_path',))
+            self.best_path = connections[self.best_island].recv()
+            self.fitnesses = []
+            for connection in connections:
+                connection.send(('fitnesses',))
+                self.fitnesses.append(connection.recv())
+        finally:
+            for connection in connections:
+                try:
+                    connection.send(('stop',))
+                except (BrokenPipeError, OSError):
+                    pass                    ## the worker is already gone
+                connection.close()
+            for process in processes:
+                process.join()
+        return min(self.best_fitnesses)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Island model genetic algorithm maze solver.")
+    parser.add_argument('--seed', type=int, default=42, help="maze seed, the islands' seeds are spawned from it")
+    parser.add_argument('--size', default=f"{cfg.MAZE_WIDTH}x{cfg.MAZE_HEIGHT}", help="e.g. 40x20")
+    parser.add_argument('--islands', type=int, default=None, help="number of islands, by default the number of CPUs")
+    parser.add_argument('--migration-interval', type=int, default=5)
+    parser.add_argument('--migration-size', type=int, default=2)
+    parser.add_argument('--topology', choices=TOPOLOGIES, default='ring')
+    parser.add_argument('--generations', type=int, default=cfg.GENERATIONS)
+    parser.add_argument('--population-size', type=int, default=cfg.POPULATION_SIZE)
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.lower().split('x'))
+    start, end = (1,1), (width-2, height-2)
+    maze = Maze(width=width, height=height)
+    maze.generate_random_maze(seed_value=args.seed, start=start, end=end)
+
+    model = IslandModel(
+        maze, start, end, islands=args.islands, migration_interval=args.migration_interval, migration_size=args.migration_size,
+        topology=args.topology, seed=args.seed, ga_config={
+            'max_generations': args.generations, 'population_size': args.population_size,
+            'mutation_rate': cfg.MUTATION_RATE, 'elitism_rate': cfg.ELITISM_RATE,
+        }
+    )
+    best_fitness = model.run()
+    print(f"best fitness {best_fitness} after {model.current_generation} generations on {model.islands} islands"
+          + (f", solved by island {model.solved_island}" if model.solved_island is not None else ""))
+    maze.print_with_path(path=model.best_path, start=start, end=end)
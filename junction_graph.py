@@ -0,0 +1,100 @@
+## std libs
+from array import array
+
+## 3rd party libs
+import numpy as np
+
+
+DIRS = [(0,1),(1,0),(0,-1),(-1,0)]          ## same order as 'Player.dirs', so direction codes can go straight into a genome. down,right,up,left
+FIRST_DIRECTION = [(mask & -mask).bit_length() - 1 for mask in range(16)]      ## lowest open direction of a 4 bit mask, -1 for 0
+DIRECTION_CODES = [[d for d in range(len(DIRS)) if mask >> d & 1] for mask in range(16)]     ## open directions of a 4 bit mask, in the order of 'DIRS'
+
+
+def open_direction_mask(walls) -> np.ndarray:
+    '''
+    Paramaters:
+        walls np.ndarray -- (width,height) wall grid, 1 is a wall
+    Returns:
+        mask np.ndarray -- uint8 (width,height), bit 'd' is set if the field is walkable and so is its neighbor in direction 'DIRS[d]'
+    '''
+    walls = np.asarray(walls, dtype=np.uint8)
+    walkable = np.pad(walls == 0, 1, constant_values=False)    ## border of walls, no bounds checks needed
+    inner = walkable[1:-1, 1:-1]
+    mask = np.zeros(walls.shape, dtype=np.uint8)
+    for d, (dx, dy) in enumerate(DIRS):
+        neighbor = walkable[1+dx:walkable.shape[0]-1+dx, 1+dy:walkable.shape[1]-1+dy]
+        mask |= ((inner & neighbor).astype(np.uint8) << d)
+    return mask
+
+
+class JunctionGraph:
+    '''
+    Corridor compressed graph of the walkable fields of a maze.
+    Nodes are the walkable fields that don't have exactly two walkable neighbors (junctions and dead ends) plus the kept fields (e.g. start and end).
+    A run of fields between two nodes (a corridor) is a single edge, so walking or searching it is one decision instead of one per field.
+    Fields are addressed by their flat index 'x*height + y' (same as 'Maze.walls.ravel()').
+        corridors -- dict node -> list of (cells, genome, target) corridors leaving the node, in the order of 'DIRS'
+                     cells array('i') are the fields of the corridor up to and including the target node, genome bytes the direction codes of its moves
+    Paramaters:
+        maze Maze -- maze with a valid 'walls' grid
+        keep list -- fields that must be nodes e.g. [(1,1),(38,18)]
+    '''
+
+    def __init__(self, maze, keep: list=()):
+        self.width = maze.width
+        self.height = height = maze.height
+        self.keep = [tuple(position) for position in keep]
+        mask = open_direction_mask(maze.walls).ravel()
+        walkable = np.asarray(maze.walls, dtype=np.uint8).ravel() == 0
+        degree = np.zeros(mask.shape, dtype=np.uint8)
+        for d in range(len(DIRS)):
+            degree += (mask >> d) & 1
+
+        is_node = walkable & (degree != 2)
+        for x, y in self.keep:
+            is_node[x*height + y] = walkable[x*height + y]
+        self.open_count = int(walkable.sum())
+
+        steps = [dx*height + dy for dx, dy in DIRS]
+        mask = mask.tolist()
+        is_node = bytearray(is_node.astype(np.uint8).tobytes())
+        self.corridors = {}
+        self.edge_count = 0
+        for node in np.flatnonzero(is_node).tolist():
+            corridors = []
+            for d in range(len(DIRS)):
+                if not mask[node] >> d & 1:
+                    continue
+                cells = array('i')
+                genome = bytearray()
+                cell, code = node + steps[d], d
+                while True:
+                    cells.append(cell)
+                    genome.append(code)
+                    if is_node[cell]:
+                        break
+                    ## a corridor field has exactly one way forward, the one it wasn't entered from
+                    code = FIRST_DIRECTION[mask[cell] & ~(1 << ((code + 2) & 3))]
+                    cell += steps[code]
+                corridors.append((cells, bytes(genome), cell))
+            self.corridors[node] = corridors
+            self.edge_count += len(corridors)
+        self.edge_count //= 2       ## every corridor is stored once from each end
+
+
+    @property
+    def node_count(self) -> int:
+        return len(self.corridors)
+
+
+    def is_node(self, position: set) -> bool:
+        return position[0]*self.height + position[1] in self.corridors
+
+
+    def edges(self) -> list:
+        '''
+        Returns:
+            edges list -- list of (node, target, length) with node and target as (x,y), every corridor listed once from each end
+        '''
+        height = self.height
+        return [(divmod(node, height), divmod(target, height), len(cells)) for node, corridors in self.corridors.items() for cells, _, target in corridors]
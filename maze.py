@@ -1,17 +1,166 @@
 ## custom libs
 import config as cfg        ## config file
-from field import Field
-from player import Player
+from field import FieldGrid
+from junction_graph import JunctionGraph, open_direction_mask, DIRS, DIRECTION_CODES
 ## std libs
 import random               
+from collections import deque
+from array import array
+## 3rd party libs
+import numpy as np
 
+UNREACHABLE = 999999999                              ## distance/fitness of a field that can not reach the end
+GENERATOR_VERSION = 1                                ## bump whenever the generated mazes change for the same seed, it invalidates the maze cache
+
+
+
+JUNCTION_MASKS = np.array([len(codes) >= 3 for codes in DIRECTION_CODES], dtype=np.uint8)     ## 1 for the direction masks of a junction
+
+
+class _MoveMaskLookup:
+    '''
+    'Maze.move_mask' of a maze whose walls aren't a NumPy array, every mask is computed from 'wall_lookup' when it's read.
+    '''
+    def __init__(self, maze):
+        self.wall_lookup = maze.wall_lookup
+        self.width = maze.width
+        self.height = maze.height
+
+    def __getitem__(self, cell: int) -> int:
+        x, y = divmod(cell, self.height)
+        if self.wall_lookup[x, y]:
+            return 0
+        mask = 0
+        for d, (dx, dy) in enumerate(DIRS):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.width and 0 <= ny < self.height and not self.wall_lookup[nx, ny]:
+                mask |= 1 << d
+        return mask
+
+
+class _JunctionFlagLookup:
+    '''
+    'Maze.junction_flags' computed from a '_MoveMaskLookup' when it's read.
+    '''
+    def __init__(self, move_mask: _MoveMaskLookup):
+        self.move_mask = move_mask
+
+    def __getitem__(self, cell: int) -> int:
+        return int(JUNCTION_MASKS[self.move_mask[cell]])
 
 
 class Maze():
-    def __init__(self):
-        self.width = cfg.MAZE_WIDTH
-        self.height = cfg.MAZE_HEIGHT
-        self.fields = []                             ## 2D array of 'Field' objects representing the fields of the maze
+    def __init__(self, width: int=None, height: int=None):
+        self.width = cfg.MAZE_WIDTH if width is None else width
+        self.height = cfg.MAZE_HEIGHT if height is None else height
+        self._allocate_grid()
+
+
+    @classmethod
+    def from_walls(cls, walls, allocate_distances: bool=True) -> 'Maze':
+        '''
+        Builds a maze around an existing wall grid without allocating a grid of its own first (the constructor allocates a full one),
+        e.g. for memory-mapped or shared grids that are far bigger than the memory that's left.
+        Paramaters:
+            walls, allocate_distances -- see 'load_walls'
+        Returns:
+            maze Maze
+        '''
+        maze = cls.__new__(cls)
+        maze.load_walls(walls, allocate_distances=allocate_distances)
+        return maze
+
+
+    def _allocate_grid(self):
+        '''
+        (Re)creates the arrays backing the maze. All fields are initially walls.
+            walls       -- uint8 array of shape (width,height); 1 is a wall, 0 is walkable. Indexed like walls[x,y]
+            distances   -- int32 array of shape (width,height); the fitness of each field (distance to the end)
+            wall_lookup -- memoryview of 'walls' used on hot paths since it's the fastest way to read a single field
+            junction_graph -- 'JunctionGraph' of the maze or None, see 'build_junction_graph'
+        '''
+        self.walls = np.ones((self.width, self.height), dtype=np.uint8)
+        self.distances = np.full((self.width, self.height), UNREACHABLE, dtype=np.int32)
+        self.wall_lookup = memoryview(self.walls)
+        self.walls_changed()
+
+
+    def load_walls(self, walls, allocate_distances: bool=True):
+        '''
+        Uses the given wall grid as the maze (no copy is made). The size of the maze is taken from the grid.
+        Paramaters:
+            walls np.ndarray -- uint8 array of shape (width,height); 1 is a wall, 0 is walkable.
+                                Anything with 'shape', 'walls[x, y]' and '__array__' works too, e.g. a 'maze_file.PackedWalls'
+            allocate_distances bool -- allocate the 'distances' array now. If False it's None until 'evaluate_fields' is called (for mazes too big to keep one around)
+        '''
+        self.width, self.height = walls.shape
+        self.walls = walls
+        self.distances = np.full((self.width, self.height), UNREACHABLE, dtype=np.int32) if allocate_distances else None
+        self.wall_lookup = memoryview(walls) if isinstance(walls, np.ndarray) else walls
+        self.walls_changed()
+
+
+    def walls_changed(self):
+        '''
+        Drops everything that was derived from the wall grid (move masks, junction graph). Call it after writing to 'walls' directly.
+        '''
+        self.dir_steps = tuple(dx*self.height + dy for dx, dy in DIRS)     ## flat index offset of every direction of 'DIRS'/'Player.dirs'
+        self.junction_graph = None
+        self._move_mask = None
+        self._junction_flags = None
+
+
+    @property
+    def move_mask(self):
+        '''
+        Open directions of every field as a 4 bit mask, indexed by the flat index 'x*height + y'. Bit 'd' is set if the field and its neighbor in direction 'Player.dirs[d]' are walkable.
+        Built once on first use (one byte per field). For wall grids that aren't NumPy arrays (e.g. a memory-mapped 'PackedWalls') the masks are computed on access instead, so the grid is never unpacked.
+        '''
+        if self._move_mask is None:
+            self._move_mask = open_direction_mask(self.walls).tobytes() if isinstance(self.walls, np.ndarray) else _MoveMaskLookup(self)
+        return self._move_mask
+
+
+    @property
+    def junction_flags(self):
+        '''
+        1 for every field with three or more open directions (a junction), 0 otherwise, indexed by the flat index like 'move_mask'.
+        A field inside a path that is not a junction has all its open neighbors in the path, only junctions can lead somewhere new.
+        '''
+        if self._junction_flags is None:
+            if isinstance(self.walls, np.ndarray):
+                mask = np.frombuffer(self.move_mask, dtype=np.uint8)
+                self._junction_flags = (JUNCTION_MASKS[mask] != 0).astype(np.uint8).tobytes()
+            else:
+                self._junction_flags = _JunctionFlagLookup(self.move_mask)
+        return self._junction_flags
+
+
+    @property
+    def junctions(self) -> np.ndarray:
+        '''
+        Returns:
+            junctions np.ndarray -- flat indices of all junctions (see 'junction_flags')
+        '''
+        flags = self.junction_flags
+        if not isinstance(flags, bytes):
+            flags = bytes(flags[cell] for cell in range(self.width * self.height))
+        return np.flatnonzero(np.frombuffer(flags, dtype=np.uint8))
+
+
+    @property
+    def fields(self) -> FieldGrid:
+        '''
+        'Field' compatible 2D view of the maze (fields[x][y]). Kept for old callers, prefer 'walls'/'is_wall'.
+        '''
+        return FieldGrid(self)
+
+
+    def is_wall(self, x:int, y:int) -> bool:
+        '''
+        Is the field on the coordinates a wall.
+        '''
+        return self.wall_lookup[x, y] == 1
 
 
     def is_within_bounds(self, x:int, y:int) -> bool:
@@ -20,14 +169,70 @@ class Maze():
         '''
         return 0 <= x < self.width and 0 <= y < self.height
 
-    def generate_random_maze(self,seed_value: int=42):
+    def fill_dead_ends(self, keep: list=()) -> int:
+        '''
+        Dead end filling: walls up every dead end field and keeps going down its corridor until a junction is reached.
+        What's left are the fields that lie on a path between the kept fields (in a perfect maze only the path from start to end), nothing else can lead to the end.
+        The maze gets a new wall grid (the old one is not modified) and new 'distances'.
+        Paramaters:
+            keep list -- fields that are never filled e.g. [start, end]
+        Returns:
+            filled int -- number of fields that were walled up
+        '''
+        height = self.height
+        walls = np.array(self.walls, dtype=np.uint8)
+        flat = walls.ravel()
+        steps = [dx*height + dy for dx, dy in DIRS]
+        mask = open_direction_mask(walls).ravel().tolist()
+        degree = [bin(m).count('1') for m in mask]
+        kept = {x*height + y for x, y in keep}
+
+        dead_ends = deque(cell for cell in np.flatnonzero(flat == 0).tolist() if degree[cell] <= 1 and cell not in kept)
+        filled = 0
+        while dead_ends:
+            cell = dead_ends.popleft()
+            flat[cell] = 1
+            filled += 1
+            for d in range(len(steps)):
+                if mask[cell] >> d & 1:
+                    neighbor = cell + steps[d]
+                    mask[neighbor] &= ~(1 << ((d + 2) & 3))
+                    degree[neighbor] -= 1
+                    if degree[neighbor] == 1 and neighbor not in kept:
+                        dead_ends.append(neighbor)
+
+        self.load_walls(walls)
+        return filled
+
+
+    def build_junction_graph(self, keep: list=()) -> JunctionGraph:
+        '''
+        Compresses the corridors of the maze into a 'JunctionGraph' and keeps it as 'junction_graph'.
+        While a maze has a junction graph 'Player' walks and mutates one junction at a time and 'astar' searches the graph, if the start and end are kept nodes.
+        Paramaters:
+            keep list -- fields that must be nodes of the graph e.g. [start, end]
+        Returns:
+            self.junction_graph JunctionGraph
+        '''
+        self.junction_graph = JunctionGraph(self, keep=keep)
+        return self.junction_graph
+
+
+    def generate_random_maze(self,seed_value: int=42, start: set=None, end: set=None, rng: random.Random=None):
         '''
         Generates the fields of the maze at random
         Paramters:
             seed_value int -- The seed used for generating the maze
+            start set -- starting position, 'config.START_COORDS' by default
+            end set -- end position, 'config.END_COORDS' by default
+            rng random.Random -- generator the maze is drawn from, 'seed_value' is not used then. By default the global 'random' module is seeded with 'seed_value'
+                                 (as it always was, so scripts that go on drawing from it keep their results). Pass one to generate mazes concurrently, e.g. 'random.Random(seed)'
+                                 gives the same maze as 'seed_value=seed' without touching the global state
         '''
-        random.seed(seed_value)
-        self._prims_maze_generation_algorithm(cfg.START_COORDS,cfg.END_COORDS)
+        if rng is None:
+            random.seed(seed_value)
+            rng = random
+        self._prims_maze_generation_algorithm(cfg.START_COORDS if start is None else start, cfg.END_COORDS if end is None else end, rng)
     
 
     def __str__(self):
@@ -35,114 +240,154 @@ class Maze():
         for y in range(self.height):
             # return_value += "# "
             for x in range(self.width):
-                return_value += f"{ '#' if self.fields[x][y].is_wall() else ' '}"
+                return_value += f"{ '#' if self.wall_lookup[x, y] else ' '}"
             return_value += "\n"
         return return_value
 
         
-    def _prims_maze_generation_algorithm(self,start_position: set,end_position: set ) -> list:
+    def _prims_maze_generation_algorithm(self,start_position: set,end_position: set, rng=random) -> list:
         '''
         Generates the fields of the maze at random using prims algorithm.
+        The frontier ('(walkable_cell, wall)' pairs) is kept in insertion order with a Fenwick tree over it.
+        Picking and removing a random pair is O(log n) instead of the O(n) list scan, while the same pair is picked for the same random draw as with a plain list,
+        so a seed always generates the same maze.
         Paramters:
             start_position set -- The starting position of the algorithm. e.g. (0,0)
             end_position set -- The end position of the algorithm. e.g. (3,4) x=3, y=4
+            rng random.Random -- source of the random draws, the 'random' module by default
         Returns:
-            self.fields list -- 2D list of Field objects.
+            self.walls np.ndarray -- 2D uint8 array, 1 for walls.
         '''
+        width, height = self.width, self.height
 
-        ## all fields are initially walls
-        self.fields = [[Field(is_wall=True,x=x,y=y) for y in range(self.height)] for x in range(self.width )]
+        ## all fields are initially walls. flat grid, index = x*height + y (same as 'walls.ravel()')
+        grid = bytearray(b'\x01') * (width * height)
 
-        DIRS = [(-2, 0), (2, 0), (0, -2), (0, 2)]
+        DIR_STEPS = (-2*height, 2*height, -2, 2)     ## flat index offsets of the neighbors. left, right, up, down
 
-        def is_in_bounds(x:int, y:int) -> bool:
-            '''helper function'''
-            return 0 <= x < self.width and 0 <= y < self.height
+        ## frontier: every pair ever added, in order. A pair is stored as 'neighbor*4 + direction', the cell it came from is 'neighbor - DIR_STEPS[direction]'
+        frontier = array('q')
+        tree = array('q', [0])                       ## Fenwick tree (1-based) counting the pairs still in the frontier
+        frontier_size = 0                            ## number of pairs still in the frontier
+
+        def add_neighbors(cell: int) -> int:
+            '''Adds all '(cell, wall)' pairs of the cell to the frontier. Returns the number of added pairs.'''
+            x, y = divmod(cell, height)
+            in_bounds = (x >= 2, x + 2 < width, y >= 2, y + 2 < height)
+            added = 0
+            for direction in range(4):
+                neighbor = cell + DIR_STEPS[direction]
+                if in_bounds[direction] and grid[neighbor]:
+                    frontier.append(neighbor*4 + direction)
+                    ## the new Fenwick node is 1 plus the nodes it covers, amortized O(1) since pairs are only ever added at the end
+                    index = len(frontier)
+                    value = 1
+                    child = index - 1
+                    lowest = index - (index & -index)
+                    while child > lowest:
+                        value += tree[child]
+                        child -= child & -child
+                    tree.append(value)
+                    added += 1
+            return added
 
-        def get_neighbors(x:int, y:int) -> list:
-            '''Retuns a list of neighbors for the field with x,y positions'''
-            nbs = []
-            for dx, dy in DIRS:
-                nx, ny = x + dx, y + dy
-                if is_in_bounds(nx, ny):
-                    nbs.append((nx, ny))
-            return nbs
-        
         sx, sy = start_position                      ## tmp variables since the code got messy, start_x, start_y
-        self.fields[sx][sy]._is_wall = False         ## mark the starting location as open
-        wall_list = []                               ## list of all '(walkable_cell, wall)' pairs encountered in the algorithm
+        grid[sx*height + sy] = 0                     ## mark the starting location as open
+        frontier_size += add_neighbors(sx*height + sy)
 
-        for new_x, new_y in get_neighbors(sx, sy):
-            if self.fields[new_x][new_y].is_wall():
-                wall_list.append(((sx, sy), (new_x, new_y)))
-        
-        while wall_list: ## while wall_list is not empty
+        while frontier_size > 0: ## while the frontier is not empty
+
+            ## same draw as 'random.choice' on a list of the remaining pairs
+            rank = rng.choice(range(frontier_size)) + 1
 
-            cell, neighbor = random.choice(wall_list)
-            wall_list.remove((cell, neighbor))
+            ## find the 'rank'-th remaining pair
+            size = len(frontier)
+            index = 0
+            step = 1 << (size.bit_length() - 1)
+            while step:
+                if index + step <= size and tree[index + step] < rank:
+                    index += step
+                    rank -= tree[index]
+                step >>= 1
+            index += 1
 
-            x1, y1 = cell
-            x2, y2 = neighbor
-            wall_x, wall_y = (x1 + x2) // 2, (y1 + y2) // 2
+            ## remove it
+            pair = frontier[index - 1]
+            frontier_size -= 1
+            while index <= size:
+                tree[index] -= 1
+                index += index & -index
 
-            if self.fields[x2][y2].is_wall():
-                self.fields[x2][y2]._is_wall = False
-                self.fields[wall_x][wall_y]._is_wall = False
-                for nnx, nny in get_neighbors(x2, y2):
-                    if self.fields[nnx][nny].is_wall():
-                        wall_list.append(((x2, y2), (nnx, nny)))
+            neighbor, direction = pair >> 2, pair & 3
+            if grid[neighbor]:
+                grid[neighbor] = 0
+                grid[neighbor - DIR_STEPS[direction] // 2] = 0
+                frontier_size += add_neighbors(neighbor)
 
         # Ensure end point is open (bottom-right corner or closest odd cell)
+        # NOTE: it's not connected to a neighbor if it's isolated. The old connecting code compared Field objects to 0 and never ran, keep it that way so seeds generate the same mazes
         ex, ey = end_position
-        if self.fields[ex][ey].is_wall():
-            self.fields[ex][ey]._is_wall = False
-            # Optionally: connect it to a neighbor if isolated
-            for new_x, new_y in get_neighbors(ex, ey):
-                if self.fields[new_x][new_y] == 0:
-                    wall_x, wall_y = (ex + new_x) // 2, (ey + new_y) // 2
-                    self.fields[wall_x][wall_y] = 0
-                    break
-
-        return self.fields
+        grid[ex*height + ey] = 0
+
+        self.load_walls(np.frombuffer(grid, dtype=np.uint8).reshape(width, height))
+        return self.walls
     
     
-    def evaluate_fields(self,start:set, end:set):
+    def has_distances(self, end: set) -> bool:
+        '''
+        Returns:
+            valid bool -- 'distances' holds the distance field of the single end 'end' (e.g. computed earlier or loaded from a 'MazeCache'), so 'evaluate_fields' can be skipped
         '''
-        Sets the fintess of each field in the maze.
-        The fitness of the end position is 0.
+        if self.distances is None or self.distances[tuple(end)] != 0:
+            return False
+        return np.count_nonzero(np.asarray(self.distances) == 0) == 1
+
+
+    def evaluate_fields(self,start:set, end):
+        '''
+        Sets the fintess of each field in the maze to its walking distance from the closest end (BFS distance transform, O(width*height)).
+        The fitness of the end position(s) is 0, fields that can not reach any end stay at 'UNREACHABLE'.
         Paramaters:
             start set -- e.g. (1,1)
-            end set -- e.g. (1,1)
-        '''
-        stack = [end]                           ## nodes that need to be visited
-        visited_positions = []                  ## nodes that have been visited
-        dirs = Player.dirs                      ## directions the unit can traverse. down,right,up,left
-
-        def get_neighboring_positions(pos: set):
-            neighbors = []
-            for direction in dirs:
-                new_pos = (pos[0] + direction[0], pos[1] + direction[1])
-                if self.is_within_bounds(new_pos[0],new_pos[1]) and not self.fields[new_pos[0]][new_pos[1]].is_wall():
-                    neighbors.append(new_pos)
-            return neighbors
-
-        self.fields[end[0]][end[1]].fitness = 0
-
-        while len(stack) > 0:
-            current_pos = stack.pop(0)
-            if current_pos in visited_positions:
-                continue
-            visited_positions.append(current_pos)
-
-            neighboring_pos = get_neighboring_positions(current_pos)
-            neighboring_pos = list(filter(lambda neighbor_position: neighbor_position not in visited_positions,neighboring_pos))
-            
-            ## update the fitness of the neighbors
-            for pos in neighboring_pos:
-                self.fields[pos[0]][pos[1]].fitness = min(self.fields[pos[0]][pos[1]].fitness, self.fields[current_pos[0]][current_pos[1]].fitness+1)
-            
-            ## append neighbors
-            stack.extend( neighboring_pos )
+            end set or list -- e.g. (1,1) or a list of exits like [(1,1),(5,7)]
+        Returns:
+            self.distances np.ndarray -- 2D int32 array of the field fitnesses
+        '''
+        ends = [end] if isinstance(end[0], int) else list(end)
+        height = self.height
+        size = self.width * self.height
+
+        ## flat lists are a lot faster than numpy scalar access. index = x*height + y (same as 'walls.ravel()')
+        walls = np.asarray(self.walls, dtype=np.uint8).ravel().tolist()
+        distances = [UNREACHABLE] * size
+        queue = deque()
+        for x, y in ends:
+            index = x*height + y
+            if distances[index] != 0:
+                distances[index] = 0
+                queue.append(index)
+
+        while queue:
+            index = queue.popleft()
+            next_distance = distances[index] + 1
+            y = index % height
+
+            ## neighbors: left, right, up, down
+            if index >= height and not walls[index-height] and distances[index-height] == UNREACHABLE:
+                distances[index-height] = next_distance
+                queue.append(index-height)
+            if index + height < size and not walls[index+height] and distances[index+height] == UNREACHABLE:
+                distances[index+height] = next_distance
+                queue.append(index+height)
+            if y > 0 and not walls[index-1] and distances[index-1] == UNREACHABLE:
+                distances[index-1] = next_distance
+                queue.append(index-1)
+            if y < height-1 and not walls[index+1] and distances[index+1] == UNREACHABLE:
+                distances[index+1] = next_distance
+                queue.append(index+1)
+
+        self.distances = np.array(distances, dtype=np.int32).reshape(self.width, self.height)
+        return self.distances
 
 
     def print_with_path(self, path: list, start: set, end:set):
@@ -169,7 +414,7 @@ class Maze():
                 elif (x, y) in path_set:
                     line += '1'
                 else:
-                    line += '#' if self.fields[x][y].is_wall() else ' '
+                    line += '#' if self.wall_lookup[x, y] else ' '
             print(line)
         
 
@@ -182,7 +427,7 @@ class Maze():
         """
         
         ## the max number of digits in any fields fitness
-        max_num_width = max([ len(str(self.fields[x][y].fitness) if not self.fields[x][y].is_wall() else "#" ) for y in range(self.height) for x in range(self.width )])
+        max_num_width = max([ len(str(self.distances[x, y]) if not self.wall_lookup[x, y] else "#" ) for y in range(self.height) for x in range(self.width )])
         
         for y in range(self.height):
             line = ""
@@ -191,9 +436,9 @@ class Maze():
                     line += 'S' * max_num_width
                 elif (x, y) == end:
                     line += 'E' * max_num_width
-                elif self.fields[x][y].is_wall():
+                elif self.wall_lookup[x, y]:
                     line += '#' * max_num_width
                 else:
-                    line += f"{str(self.fields[x][y].fitness):>{max_num_width}}"
+                    line += f"{str(self.distances[x, y]):>{max_num_width}}"
                 line += ' '
             print(line)
\ No newline at end of file
@@ -0,0 +1,148 @@
+## custom libs
+from maze import Maze, GENERATOR_VERSION
+from AStar import astar
+import config as cfg
+
+## std libs
+import os
+import json
+import random
+import shutil
+import hashlib
+import tempfile
+
+## 3rd party libs
+import numpy as np
+
+
+class MazeCache:
+    '''
+    On-disk cache of generated mazes and their precomputed artifacts, keyed by (seed, width, height, start, end, generator version).
+    Every entry is a directory with NumPy '.npy' files that are memory-mapped when loaded:
+        walls.npy     -- uint8 (width,height) wall grid
+        astar.npy     -- int32 (length,2) path returned by 'astar', missing if there is no path
+        distances.npy -- int32 (width,height) distance map from 'Maze.evaluate_fields'
+        random.json   -- state of the 'random' module right after generating the maze
+    Loading restores the 'random' state, so a run on a cached maze continues exactly like one on a freshly generated maze.
+    When the cache grows over 'max_bytes' the least recently used entries are removed.
+    Paramaters:
+        directory str -- where the entries are stored
+        max_bytes int -- size limit of the cache
+    '''
+
+    def __init__(self, directory: str=cfg.CACHE_DIR, max_bytes: int=cfg.CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+
+    @staticmethod
+    def key(seed: int, width: int, height: int, start: set, end: set) -> str:
+        '''
+        Returns:
+            key str -- name of the cache entry
+        '''
+        description = json.dumps([seed, width, height, list(start), list(end), GENERATOR_VERSION])
+        return hashlib.sha256(description.encode()).hexdigest()[:32]
+
+
+    def load(self, seed: int, width: int=None, height: int=None, start: set=None, end: set=None):
+        '''
+        Returns the maze for the seed from the cache, generating and storing it first if it's not cached yet.
+        Defaults are the same as for 'Maze' and 'Maze.generate_random_maze'.
+        Returns:
+            maze Maze -- the maze, its 'walls' and 'distances' are read-only memory-mapped arrays
+            astar_path list -- path returned by 'astar' or None
+        '''
+        width = cfg.MAZE_WIDTH if width is None else width
+        height = cfg.MAZE_HEIGHT if height is None else height
+        start = cfg.START_COORDS if start is None else tuple(start)
+        end = cfg.END_COORDS if end is None else tuple(end)
+
+        entry = os.path.join(self.directory, self.key(seed, width, height, start, end))
+        if not os.path.isdir(entry):
+            self._store(entry, seed, width, height, start, end)
+        os.utime(entry)                 ## mark as recently used
+
+        maze = Maze.from_walls(np.load(os.path.join(entry, 'walls.npy'), mmap_mode='r'), allocate_distances=False)
+        maze.distances = np.load(os.path.join(entry, 'distances.npy'), mmap_mode='r')
+
+        astar_file = os.path.join(entry, 'astar.npy')
+        astar_path = [tuple(position) for position in np.load(astar_file).tolist()] if os.path.exists(astar_file) else None
+
+        with open(os.path.join(entry, 'random.json')) as f:
+            version, internal_state, gauss_next = json.load(f)
+        random.setstate((version, tuple(internal_state), gauss_next))
+        return maze, astar_path
+
+
+    def _store(self, entry: str, seed: int, width: int, height: int, start: set, end: set):
+        '''
+        Generates the maze and its artifacts and stores them under 'entry'.
+        Everything is written to a temporary directory first and then renamed, so a killed process never leaves a half written entry.
+        '''
+        maze = Maze(width=width, height=height)
+        maze.generate_random_maze(seed_value=seed, start=start, end=end)
+        random_state = random.getstate()
+        astar_path = astar(maze=maze, start=start, end=end)
+        maze.evaluate_fields(start=start, end=end)
+
+        tmp_entry = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        np.save(os.path.join(tmp_entry, 'walls.npy'), maze.walls)
+        np.save(os.path.join(tmp_entry, 'distances.npy'), maze.distances)
+        if astar_path is not None:
+            np.save(os.path.join(tmp_entry, 'astar.npy'), np.array(astar_path, dtype=np.int32))
+        with open(os.path.join(tmp_entry, 'random.json'), 'w') as f:
+            json.dump(random_state, f)
+
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:
+            shutil.rmtree(tmp_entry)    ## another process stored the same entry in the meantime
+        self.evict(keep=entry)
+        random.setstate(random_state)
+
+
+    def size(self) -> int:
+        '''
+        Returns:
+            size int -- size of all entries in bytes
+        '''
+        return sum(size for _, size, _ in self._entries())
+
+
+    def _entries(self) -> list:
+        '''
+        Returns:
+            entries list -- list of (path, size in bytes, last use time)
+        '''
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith('.tmp-') or not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, file)) for file in os.listdir(path))
+            entries.append((path, size, os.path.getmtime(path)))
+        return entries
+
+
+    def evict(self, keep: str=None):
+        '''
+        Removes the least recently used entries until the cache is within 'max_bytes'.
+        Paramaters:
+            keep str -- path of an entry that must not be removed (the one that's about to be used)
+        '''
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+    def clear(self):
+        for path, _, _ in self._entries():
+            shutil.rmtree(path, ignore_errors=True)
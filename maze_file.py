@@ -0,0 +1,110 @@
+'''
+Binary maze file format for mazes that are too big for a byte per field.
+
+Layout (little-endian):
+    magic   4 bytes  -- b'MAZE'
+    version uint16   -- FORMAT_VERSION
+    flags   uint16   -- reserved, 0
+    width   uint32
+    height  uint32
+    walls   ceil(width*height/8) bytes -- bit-packed wall grid, field (x,y) is bit 'x*height + y' (most significant bit first, like 'np.packbits'), 1 is a wall
+
+Example:
+    python maze_file.py --seed 42 --size 2001x2001 maze_2001.maze        ## export a generated maze
+'''
+
+## custom libs
+from maze import Maze
+import config as cfg
+
+## std libs
+import mmap
+import struct
+import argparse
+
+## 3rd party libs
+import numpy as np
+
+
+MAGIC = b'MAZE'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+
+
+class PackedWalls:
+    '''
+    Read-only wall grid backed by a bit-packed buffer (e.g. a memory-mapped maze file), nothing is copied.
+    Supports 'walls[x, y]' like the NumPy wall grid of 'Maze', so it can be used as 'Maze.walls' and 'Maze.wall_lookup'.
+    Converting it to a NumPy array ('np.asarray') unpacks a full copy, which is what the whole-grid algorithms (BFS distance field, batch engine) do.
+    Paramaters:
+        bits buffer -- the packed grid
+        width int
+        height int
+    '''
+
+    def __init__(self, bits, width: int, height: int):
+        self.bits = bits
+        self.shape = (width, height)
+        self._height = height
+
+    def __getitem__(self, position) -> int:
+        index = position[0]*self._height + position[1]
+        return (self.bits[index >> 3] >> (7 - (index & 7))) & 1
+
+    def __array__(self, dtype=None, copy=None):
+        walls = np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8), count=self.shape[0]*self.shape[1]).reshape(self.shape)
+        return walls if dtype is None else walls.astype(dtype)
+
+    @property
+    def nbytes(self) -> int:
+        return self.shape[0] * self.shape[1]        ## size once unpacked, like 'np.ndarray.nbytes'
+
+
+def export_maze(maze: Maze, path: str):
+    '''
+    Writes the maze to a maze file.
+    Paramaters:
+        maze Maze -- maze with a valid 'walls' grid
+        path str -- file path
+    '''
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, maze.width, maze.height))
+        f.write(np.packbits(np.asarray(maze.walls, dtype=np.uint8).ravel()).tobytes())
+
+
+def open_maze(path: str) -> Maze:
+    '''
+    Opens a maze file through 'mmap', the wall grid is read straight from the mapped file.
+    The 'distances' of the maze are not allocated until 'Maze.evaluate_fields' is called.
+    Paramaters:
+        path str -- file path
+    Returns:
+        maze Maze -- maze whose 'walls' is a 'PackedWalls'
+    '''
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)      ## stays valid after the file is closed
+
+    magic, version, _, width, height = HEADER.unpack_from(mapped)
+    if magic != MAGIC:
+        raise ValueError(f"'{path}' is not a maze file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"'{path}' has format version {version}, only version {FORMAT_VERSION} is supported")
+    packed_size = (width*height + 7) // 8
+    if len(mapped) < HEADER.size + packed_size:
+        raise ValueError(f"'{path}' is truncated")
+
+    return Maze.from_walls(PackedWalls(memoryview(mapped)[HEADER.size:HEADER.size + packed_size], width, height), allocate_distances=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export a generated maze to a maze file.")
+    parser.add_argument('path')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--size', default=f"{cfg.MAZE_WIDTH}x{cfg.MAZE_HEIGHT}", help="e.g. 2001x2001")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.lower().split('x'))
+    maze = Maze(width=width, height=height)
+    maze.generate_random_maze(seed_value=args.seed, start=(1,1), end=(width-2, height-2))
+    export_maze(maze, args.path)
+    print(f"wrote {width}x{height} maze (seed {args.seed}) to '{args.path}'")
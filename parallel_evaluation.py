@@ -0,0 +1,140 @@
+## custom libs
+from maze import Maze
+from player import Player
+
+## std libs
+import os
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+## 3rd party libs
+import numpy as np
+
+
+_worker_maze = None                 ## Maze object of the worker process, backed by the shared memory block
+_worker_shared_memory = []          ## keeps the shared memory blocks attached for the lifetime of the worker
+
+
+def _init_process_worker(shared_memory_name: str, width: int, height: int, distances_shared_memory_name: str=None, junction_keep: list=None):
+    '''
+    Process pool initializer. Attaches to the shared wall grid (and distance field) once per worker instead of pickling the maze for every task.
+    If 'junction_keep' is given the worker builds its own junction graph with those kept fields, like the one of the main process.
+    '''
+    global _worker_maze
+    walls_memory = shared_memory.SharedMemory(name=shared_memory_name)
+    _worker_shared_memory.append(walls_memory)
+    _worker_maze = Maze.from_walls(np.ndarray((width, height), dtype=np.uint8, buffer=walls_memory.buf), allocate_distances=False)
+    if distances_shared_memory_name is not None:
+        distances_memory = shared_memory.SharedMemory(name=distances_shared_memory_name)
+        _worker_shared_memory.append(distances_memory)
+        _worker_maze.distances = np.ndarray((width, height), dtype=np.int32, buffer=distances_memory.buf)
+    if junction_keep is not None:
+        _worker_maze.build_junction_graph(keep=junction_keep)
+
+
+def _walk_shard(shard: list, maze: Maze=None, fitness_mode: str='euclidean') -> list:
+    '''
+    Walks and evaluates every player in the shard.
+    Paramaters:
+        shard list -- list of (cells, genome, end, seed) tuples, cells and genome as in 'Player'
+        maze Maze -- the maze to walk in. Process workers leave it out and use the shared one
+        fitness_mode str -- see 'Player.evaluate'
+    Returns:
+        results list -- list of (new_cells_tail, new_genome_tail, fitness, can_walk) tuples, in the order of the shard
+    '''
+    maze = _worker_maze if maze is None else maze
+    results = []
+    for cells, genome, end, seed in shard:
+        player = Player(divmod(cells[0], maze.height), end, maze, best_path=None)
+        player.set_genome(array('i', cells), bytearray(genome))
+        player.rng = random.Random(seed)
+        fitness = player.evaluate(fitness_mode=fitness_mode)
+        results.append((player.cells[len(cells):], player.genome[len(genome):].tobytes(), fitness, player.can_walk))
+    return results
+
+
+class ParallelEvaluator:
+    '''
+    Evaluates the players of a population on a pool of workers.
+    Each player that still has to walk gets its own seed drawn from 'rng' and walks with its own 'random.Random', so the results only depend on the seed of the run and not on the number of workers or how the population is sharded.
+    Paramaters:
+        maze Maze -- the maze all players walk in
+        mode str -- 'process' (shares the maze through shared memory) or 'thread' (for free-threaded builds)
+        workers int -- number of workers, by default the number of CPUs
+        shards_per_worker int -- the population is split into 'workers * shards_per_worker' tasks
+        fitness_mode str -- see 'Player.evaluate'. For 'maze_distance' the distance field of the maze is shared with the workers as well
+        rng random.Random -- the per player seeds are drawn from it, the global 'random' module by default
+    '''
+
+    def __init__(self, maze: Maze, mode: str='process', workers: int=None, shards_per_worker: int=4, fitness_mode: str='euclidean', rng: random.Random=None):
+        if mode not in ('process', 'thread'):
+            raise ValueError(f"Unknown executor mode '{mode}', expected 'process' or 'thread'")
+        self.maze = maze
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.shards_per_worker = shards_per_worker
+        self.fitness_mode = fitness_mode
+        self.rng = random if rng is None else rng
+        self._shared_memory = []
+
+        if mode == 'process':
+            walls_memory = self._share(np.asarray(maze.walls, dtype=np.uint8))
+            junction_keep = None if maze.junction_graph is None else maze.junction_graph.keep
+            distances_name = self._share(np.asarray(maze.distances, dtype=np.int32)).name if fitness_mode == 'maze_distance' else None
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_process_worker, initargs=(walls_memory.name, maze.width, maze.height, distances_name, junction_keep))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+
+    def _share(self, values: np.ndarray) -> shared_memory.SharedMemory:
+        '''
+        Copies the array into a new shared memory block that is freed by 'close'.
+        '''
+        memory = shared_memory.SharedMemory(create=True, size=values.nbytes)
+        np.ndarray(values.shape, dtype=values.dtype, buffer=memory.buf)[:] = values
+        self._shared_memory.append(memory)
+        return memory
+
+
+    def evaluate(self, population: list):
+        '''
+        Evaluates/updates the fitness value of all given players, same as calling 'Player.evaluate' on each of them.
+        '''
+        walking = [player for player in population if player.can_walk]
+        stuck = [player for player in population if not player.can_walk]
+        tasks = [(player.cells.to_array(), player.genome.tobytes(), player.end, self.rng.getrandbits(64)) for player in walking]
+
+        shard_count = min(len(tasks), self.workers * self.shards_per_worker)
+        if shard_count > 0:
+            shard_size = -(-len(tasks) // shard_count)
+            shards = [tasks[i:i+shard_size] for i in range(0, len(tasks), shard_size)]
+            if self.mode == 'process':
+                shard_results = self._executor.map(_walk_shard, shards, [None] * len(shards), [self.fitness_mode] * len(shards))
+            else:
+                shard_results = self._executor.map(_walk_shard, shards, [self.maze] * len(shards), [self.fitness_mode] * len(shards))
+
+            results = [result for shard_result in shard_results for result in shard_result]
+            for player, (cells_tail, genome_tail, fitness, can_walk) in zip(walking, results):
+                player.extend_genome(cells_tail, genome_tail)
+                player.fitness = fitness
+                player.can_walk = can_walk
+                player.is_dirty = False
+                if player.profiler is not None:
+                    player.profiler.count('steps_walked', len(cells_tail))     ## probes and walk time of the workers are not recorded
+
+        ## players that are already stuck don't walk, only their fitness is updated
+        for player in stuck:
+            player.evaluate(fitness_mode=self.fitness_mode)
+
+
+    def close(self):
+        '''
+        Shuts the workers down and frees the shared memory.
+        '''
+        self._executor.shutdown()
+        for memory in self._shared_memory:
+            memory.close()
+            memory.unlink()
+        self._shared_memory = []
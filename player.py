@@ -1,32 +1,128 @@
 ## std libs
 import random
 import copy
+import time
+from array import array
 
 ## custom libs
 from AStar import astar,manhattan_distance,euclidean_distance
+from junction_graph import DIRECTION_CODES
+from shared_path import SharedPath
+
+
+FITNESS_MODES = ('euclidean', 'manhattan', 'maze_distance')     ## distance to the end the fitness is based on, see 'Player.evaluate'
 
 class Player:
     '''
     Unit in the population of the genetic algorithm
+
+    The genome is compact: 'genome' holds the direction codes (index into 'dirs', one per move) and 'cells' the packed field indices (x*height + y) of the path.
+    Both are 'SharedPath's, so the children of crossovers and mutations share the prefix they got from their parent instead of copying it.
+    'path' and 'movement_instructions' are built from them on access, so keep them off hot paths.
+    The visited set only exists while it's needed (walking, mutating), players that are done walking don't keep it around.
     '''
-    fitness = 0                             ## The lower the better
-    dirs = [(0,1),(1,0),(0,-1),(-1,0)]      ## directions the unit can traverse. down,right,up,left
-    can_walk = True                         ## can the player walk or is he stuck
+    __slots__ = ('genome', 'cells', '_visited', 'is_dirty', 'maze', 'end', 'best_path', 'fitness', 'can_walk', 'rng', 'profiler', '_height')
 
-    def __init__(self, start: set, end: set, maze, best_path: list):
-        self.movement_instructions = []     ## list of directions e.g. [(0,1),(1,0),...] all the way to the last position
-        self.path = [start]                 ## the path this player took. e.g [start,(2,3),(3,3),...,end]
+    dirs = [(0,1),(1,0),(0,-1),(-1,0)]      ## directions the unit can traverse. down,right,up,left
+    DIR_CODES = {d: code for code, d in enumerate(dirs)}     ## direction -> code in the genome
+
+    def __init__(self, start: set, end: set, maze, best_path: list, rng=None, profiler=None):
+        self._height = maze.height
+        self.genome = SharedPath('B')       ## direction code of every move e.g. [0,1,...] all the way to the last position
+        self.cells = SharedPath('i', [start[0]*self._height + start[1]])   ## packed fields of the path this player took. [start,...,end]
+        self._visited = None                ## set of all cells in 'cells', so visited checks are O(1). Built on demand, see 'visited'
+        self.is_dirty = True                ## has the path changed since the last 'evaluate' (is 'fitness' stale)
         self.maze = maze                    ## the Maze object
         self.end = end                      ## end coordinates
-        # self.color = (random.randrange(0,255), random.randrange(0,255), random.randrange(0,255))
-        self.best_path = best_path                  ## best path returned by the A* algorithm
-        # self.maxdistance = len(best_path)           ## 
-        # self.maxdistance = manhattan(init[1],init[0],end[1],end[0])
+        self.best_path = best_path          ## best path returned by the A* algorithm
+        self.fitness = 0                    ## The lower the better
+        self.can_walk = True                ## can the player walk or is he stuck
+        self.rng = random if rng is None else rng   ## source of all random draws (walks, crossover points, mutations), e.g. a 'random.Random' instance. The global 'random' module by default
+        self.profiler = profiler            ## 'GenerationProfiler' of the 'GeneticAlgorithm' this player belongs to, passed on to its children. None means no instrumentation
 
     def __str__(self):
         return str(self.path)+" Fitness: "+str(self.fitness)
 
 
+    @property
+    def path(self) -> list:
+        '''
+        The path this player took. e.g [start,(2,3),(3,3),...,end]. A new list is built on every access.
+        '''
+        height = self._height
+        return [divmod(cell, height) for cell in self.cells]
+
+    @property
+    def movement_instructions(self) -> list:
+        '''
+        List of directions e.g. [(0,1),(1,0),...] all the way to the last position. A new list is built on every access.
+        '''
+        dirs = self.dirs
+        return [dirs[code] for code in self.genome]
+
+    @property
+    def visited(self) -> set:
+        '''
+        Set of the packed cells of the path.
+        '''
+        if self._visited is None:
+            self._visited = set(self.cells)
+        return self._visited
+
+    @property
+    def start(self) -> set:
+        return divmod(self.cells[0], self._height)
+
+    @property
+    def current_position(self) -> set:
+        return divmod(self.cells.last, self._height)
+
+    @property
+    def win(self) -> bool:
+        '''
+        Did the player reach the end.
+        '''
+        return self.current_position == tuple(self.end)
+
+
+    def set_path(self, path: list, movement_instructions: list):
+        '''
+        Replaces the path and the movement instructions of the player.
+        Paramaters:
+            path list -- e.g [start,(2,3),(3,3),...]
+            movement_instructions list -- e.g. [(0,1),(1,0),...]
+        '''
+        height = self._height
+        self.set_genome(array('i', [x*height + y for x, y in path]), bytearray(self.DIR_CODES[d] for d in movement_instructions))
+
+
+    def set_genome(self, cells: array, genome: bytearray):
+        '''
+        Replaces the path and the movement instructions of the player with packed ones.
+        'SharedPath's are taken as they are (e.g. a prefix of a parent's path, see 'SharedPath'), anything else is copied into one.
+        Paramaters:
+            cells SharedPath or array -- packed fields of the path
+            genome SharedPath or bytearray -- direction codes of the moves
+        '''
+        self.cells = cells if isinstance(cells, SharedPath) else SharedPath('i', cells)
+        self.genome = genome if isinstance(genome, SharedPath) else SharedPath('B', genome)
+        self._visited = None
+        self.is_dirty = True
+
+
+    def extend_genome(self, cells: array, genome: bytes):
+        '''
+        Appends packed moves to the path, e.g. the moves a worker made for this player. The moves must be valid.
+        Paramaters:
+            cells array -- packed fields to append to 'cells'
+            genome bytes -- direction codes to append to 'genome'
+        '''
+        self.cells.extend(cells)
+        self.genome.extend(genome)
+        self._visited = None
+        self.is_dirty = True
+
+
     def _get_new_pos(self, d: set, pos: set=None):
         """
         Returns the new position.
@@ -37,21 +133,40 @@ class Player:
         if pos is not None and len(pos) >= 2 and isinstance(pos[0],int) and isinstance(pos[1],int):
             return pos[0]+d[0], pos[1]+d[1]
         
-        return self.path[-1][0]+d[0], self.path[-1][1]+d[1]
+        x, y = divmod(self.cells.last, self._height)
+        return x+d[0], y+d[1]
         
 
     def _is_valid_direction(self, d, pos: set=None, allow_backtracking: bool=False) -> bool:
         '''
         The direction must lead to field within bounds that is not a wall and has not been visited yet.
+        Walls and bounds are a lookup in the maze's precomputed 'move_mask'.
         Paramaters:
             pos set -- postiion from which to find the valid directions e.g. (5,3) 
             allow_backtracking bool -- are directions that lead onto a field that's already in the path allowed
         '''
-        newpos = self._get_new_pos(d,pos=pos)
-        is_valid = self.maze.is_within_bounds(newpos[0],newpos[1]) and self.maze.fields[newpos[0]][newpos[1]].is_wall() == False    
-        if not allow_backtracking:
-            is_valid = is_valid and newpos not in self.path
-        return is_valid 
+        if self.profiler is not None:
+            self.profiler.count('cells_probed')
+        cell = self.cells.last if pos is None else pos[0]*self._height + pos[1]
+        code = self.DIR_CODES[d]
+        if not self.maze.move_mask[cell] >> code & 1:
+            return False
+        return allow_backtracking or cell + self.maze.dir_steps[code] not in self.visited
+
+
+    def _valid_codes(self, cell: int) -> list:
+        '''
+        Paramaters:
+            cell int -- packed field
+        Returns:
+            codes list -- direction codes (in the order of 'dirs') that lead from the field onto a walkable field that has not been visited yet
+        '''
+        codes = DIRECTION_CODES[self.maze.move_mask[cell]]
+        if self.profiler is not None:
+            self.profiler.count('cells_probed', len(codes))
+        steps = self.maze.dir_steps
+        visited = self.visited
+        return [code for code in codes if cell + steps[code] not in visited]
 
 
     def _get_valid_dirs_for_position(self,pos: set, allow_backtracking: bool=False) -> list:
@@ -62,11 +177,10 @@ class Player:
         Returns:
             valid_dirs list -- list of directions e.g. [(1,0),(0,-1),...]
         '''
-        valid_dirs = []
-        for d in self.dirs:
-            if self._is_valid_direction(d, pos= pos, allow_backtracking= allow_backtracking):
-                valid_dirs.append(d)
-        return valid_dirs
+        cell = pos[0]*self._height + pos[1]
+        if allow_backtracking:
+            return [self.dirs[code] for code in DIRECTION_CODES[self.maze.move_mask[cell]]]
+        return [self.dirs[code] for code in self._valid_codes(cell)]
 
     
     def step(self, direction: set=None):
@@ -77,23 +191,28 @@ class Player:
         Paramaters:
             d set -- direction e.g. (1,0) or (0,-1)
         '''
+        cell = self.cells.last
+        valid_codes = self._valid_codes(cell)
+        code = None
         if direction is None:
-            valid_directions = list(filter(lambda d: self._is_valid_direction(d),self.dirs))
-
-            if len(valid_directions) > 0:
-                direction = random.choice(valid_directions)
+            if len(valid_codes) > 0:
+                code = self.rng.choice(valid_codes)
+        elif self.DIR_CODES[direction] in valid_codes:
+            code = self.DIR_CODES[direction]
     
-        if direction is not None and self._is_valid_direction(direction):
-            self.movement_instructions.append(direction)
-            new_position = self._get_new_pos(direction)
-            self.current_position = new_position
-            self.path.append(new_position)
+        if code is not None:
+            self.genome.append(code)
+            new_cell = cell + self.maze.dir_steps[code]
+            self.cells.append(new_cell)
+            self.visited.add(new_cell)
+            self.is_dirty = True
             
-            if self.path[-1] == self.end:
+            if new_cell == self.end[0]*self._height + self.end[1]:
                 self.can_walk = False
-                self.win = True
+                self._visited = None     ## done walking, the set is rebuilt if it's needed again
         else:
             self.can_walk = False        ## this player has reached a dead end
+            self._visited = None
 
 
     def walk(self, movement_instructions_stack: list=None):
@@ -106,13 +225,38 @@ class Player:
         Paramaters:
             movement_instructions_stack list -- list of directions e.g. [(1,0),...]
         '''
+        if self.profiler is None:
+            self._walk(movement_instructions_stack)
+            return
+
+        started = time.perf_counter()
+        path_length = len(self.cells)
+        self._walk(movement_instructions_stack)
+        self.profiler.add_time('walk', time.perf_counter() - started)
+        self.profiler.count('steps_walked', len(self.cells) - path_length)
+
+
+    def _walk(self, movement_instructions_stack: list=None):
+        '''
+        See 'walk'.
+        '''
+        graph = self.maze.junction_graph
+        if graph is not None and self.end[0]*self._height + self.end[1] not in graph.corridors:
+            graph = None                ## the end is inside a corridor, corridors can't be walked at once
+
         if movement_instructions_stack is None or len(movement_instructions_stack) <= 0:
             ## walk at random
+            if graph is not None:
+                self._walk_junctions(graph)
+                return
             while self.can_walk:
                 self.step()
             return 
         
         while self.can_walk:
+            if graph is not None and len(movement_instructions_stack) <= 0:
+                self._walk_junctions(graph)     ## out of instructions, the rest is a random walk
+                return
             
             first_valid_direction, id = self._find_first_valid_direction(movement_instructions_stack)
             
@@ -120,7 +264,7 @@ class Player:
             if first_valid_direction is None:
                 valid_directions = list(filter(lambda d: self._is_valid_direction(d),self.dirs))
                 if len(valid_directions) > 0:
-                    first_valid_direction = random.choice(valid_directions)
+                    first_valid_direction = self.rng.choice(valid_directions)
             
             if id is not None:
                 ## remove the direction from 'movement_instructions_stack'
@@ -140,37 +284,67 @@ class Player:
             # else:
             #     self.canwalk = False        ## this player has reached a dead end
 
-    def evaluate(self, fields: list = None):
+    def _walk_junctions(self, graph):
+        '''
+        Random walk on the junction graph of the maze, same as stepping at random but a corridor is walked in one go.
+        On a junction a random corridor that leads to unvisited fields is picked, inside a corridor (e.g. after a crossover or mutation cut) the player steps to its end.
+        Paramaters:
+            graph JunctionGraph -- 'maze.junction_graph', the end must be one of its nodes
+        '''
+        corridors = graph.corridors
+        end = self.end[0]*self._height + self.end[1]
+        visited = self.visited
+        while self.can_walk:
+            cell = self.cells.last
+            if cell not in corridors:
+                self.step()
+                visited = self.visited
+                continue
+            if self.profiler is not None:
+                self.profiler.count('cells_probed', len(corridors[cell]))
+            valid_corridors = [corridor for corridor in corridors[cell] if corridor[2] not in visited and corridor[0][0] not in visited]
+            if len(valid_corridors) <= 0:
+                self.can_walk = False        ## this player has reached a dead end
+                self._visited = None
+                return
+            cells, genome, target = self.rng.choice(valid_corridors)
+            self.cells.extend(cells)
+            self.genome.extend(genome)
+            visited.update(cells)
+            self.is_dirty = True
+            if target == end:
+                self.can_walk = False
+                self._visited = None
+
+
+    def evaluate(self, fields: list = None, fitness_mode: str = 'euclidean'):
         '''
         Moves the player and then updates the players fitness value.
+        Paramaters:
+            fields 2D list -- deprecated and ignored, kept so old calls still work. 'maze_distance' reads 'maze.distances' instead
+            fitness_mode str -- one of 'FITNESS_MODES'. 'maze_distance' reads the walking distance to the end from 'maze.distances', so 'Maze.evaluate_fields' has to be called first
         Returns:
             fitness -- the updated fitness value
-            fields 2D list -- fields from the maze object
         '''
         self.walk()                     ## get a solution
-        last_position = self.path[-1]
-        
-
-        ## evaluate them in a simple manner
-        ##! MANNHATTAN DISTANCE
-        # self.fitness = manhattan_distance(last_position,self.end) 
-        
-        ##! EUCLIDIAN DISTANCE
-        self.fitness = euclidean_distance(last_position,self.end) 
+        last_position = self.current_position
+
+        if fitness_mode == 'euclidean':
+            self.fitness = euclidean_distance(last_position,self.end)
+        elif fitness_mode == 'manhattan':
+            self.fitness = manhattan_distance(last_position,self.end)
+        elif fitness_mode == 'maze_distance':
+            self.fitness = int(self.maze.distances[last_position])      ## precomputed distance field, a single array lookup
+        else:
+            raise ValueError(f"Unknown fitness mode '{fitness_mode}', expected one of {FITNESS_MODES}")
 
         ## EUCLIDEAN DISTANCE OF ALL ELEMENTS IN THE PATH
         # new_fitness = 0
         # for position in self.path:
         #     new_fitness += euclidean_distance(position,self.end)
         # self.fitness = new_fitness
-        
-        ## 3rd OPTION OF USING THE FITNESS OF THE FIELDS
-        ##! try using the fields fitness
-        # if fields is not None:
-        #     self.fitness = fields[last_position[0]][last_position[1]].fitness
-        # else:
-        #     self.fitness = -99 
 
+        self.is_dirty = False
         return self.fitness
 
 
@@ -186,23 +360,21 @@ class Player:
         better_parent = min(self,partner,key=lambda x: x.fitness)                 ## find the better parent
         other_parent  = max(self,partner,key=lambda x: x.fitness)                 
         
-        crossover_index = random.random() * min(len(better_parent.path),len(other_parent.path))  ## find the crossover point
+        crossover_index = self.rng.random() * min(len(better_parent.cells),len(other_parent.cells))  ## find the crossover point
         crossover_index = max(crossover_index,1) ## must contain the start
         crossover_index = int(crossover_index)
 
-        child1 = Player(start= better_parent.path[0], end= better_parent.end, maze= better_parent.maze, best_path= better_parent.best_path)
-        child1.path = better_parent.path[:crossover_index]
-        child1.movement_instructions = better_parent.movement_instructions[:crossover_index-1]
+        child1 = Player(start= better_parent.start, end= better_parent.end, maze= better_parent.maze, best_path= better_parent.best_path, rng= self.rng, profiler= self.profiler)
+        child1.set_genome(better_parent.cells[:crossover_index], better_parent.genome[:crossover_index-1])
         
         ## use the other parents movement instructions as a stack to repair the path (aka. find a path to the end)
-        remaining_movement_instructions =  other_parent.movement_instructions[:].copy()
+        remaining_movement_instructions =  other_parent.movement_instructions
         child1.walk(remaining_movement_instructions)
 
         ## do the same for the second child
-        child2 = Player(start= other_parent.path[0], end= other_parent.end, maze= other_parent.maze, best_path= other_parent.best_path)
-        child2.path = other_parent.path[:crossover_index]
-        child2.movement_instructions = other_parent.movement_instructions[:crossover_index-1]
-        remaining_movement_instructions = better_parent.movement_instructions[:].copy()
+        child2 = Player(start= other_parent.start, end= other_parent.end, maze= other_parent.maze, best_path= other_parent.best_path, rng= self.rng, profiler= self.profiler)
+        child2.set_genome(other_parent.cells[:crossover_index], other_parent.genome[:crossover_index-1])
+        remaining_movement_instructions = better_parent.movement_instructions
         child2.walk(remaining_movement_instructions)
 
         return child1,child2
@@ -220,23 +392,18 @@ class Player:
         better_parent = min(self,partner,key=lambda x: x.fitness)                 ## find the better parent
         other_parent  = max(self,partner,key=lambda x: x.fitness)                 
         
-        crossover_index = random.random() * min(len(better_parent.path),len(other_parent.path))  ## find the crossover point
+        crossover_index = self.rng.random() * min(len(better_parent.cells),len(other_parent.cells))  ## find the crossover point
         crossover_index = max(crossover_index,1) ## must contain the start
         crossover_index = int(crossover_index)
 
-        child1 = Player(start= better_parent.path[0], end= better_parent.end, maze= better_parent.maze, best_path= better_parent.best_path)
-        child1.path = better_parent.path[:crossover_index]
-        child1.movement_instructions = better_parent.movement_instructions[:crossover_index-1]
+        child1 = Player(start= better_parent.start, end= better_parent.end, maze= better_parent.maze, best_path= better_parent.best_path, rng= self.rng, profiler= self.profiler)
+        child1.set_genome(better_parent.cells[:crossover_index], better_parent.genome[:crossover_index-1])
         
-        ## use the other parents movement instructions as a stack to repair the path (aka. find a path to the end)
-        remaining_movement_instructions =  other_parent.movement_instructions[:].copy()
         child1.walk()
 
         ## do the same for the second child
-        child2 = Player(start= other_parent.path[0], end= other_parent.end, maze= other_parent.maze, best_path= other_parent.best_path)
-        child2.path = other_parent.path[:crossover_index]
-        child2.movement_instructions = other_parent.movement_instructions[:crossover_index-1]
-        remaining_movement_instructions = better_parent.movement_instructions[:].copy()
+        child2 = Player(start= other_parent.start, end= other_parent.end, maze= other_parent.maze, best_path= other_parent.best_path, rng= self.rng, profiler= self.profiler)
+        child2.set_genome(other_parent.cells[:crossover_index], other_parent.genome[:crossover_index-1])
         child2.walk()
 
         return child1,child2
@@ -270,25 +437,29 @@ class Player:
         mutatable_positions = []      ## position that are junctions with an unexplored path. e.g. [(3,(5,5)),(8,(9,4))] the first is the id in the path and the second is the position in the maze
         
         ## find all positions that we can perform a mutation on
-        for id,pos in enumerate(self.path):
-            tmp = len(self._get_valid_dirs_for_position(pos= pos))
-            if len(self._get_valid_dirs_for_position(pos= pos)) >= 1:
-                mutatable_positions.append((id,pos))
+        ## only junctions and the start can have an unexplored direction, any other field of the path has all its open neighbors in the path
+        ## the last field has no move that could be replaced (e.g. the exit of a player that reached it), so it's never a mutation point
+        junction_flags = self.maze.junction_flags
+        moves = len(self.genome)
+        for id,cell in enumerate(self.cells):
+            if id >= moves:
+                break
+            if (junction_flags[cell] or id == 0) and len(self._valid_codes(cell)) >= 1:
+                mutatable_positions.append((id,divmod(cell, self._height)))
         
         if len(mutatable_positions) <= 0:
             return 
 
         ## mutation position
-        id,pos = random.choice(mutatable_positions)
+        id,pos = self.rng.choice(mutatable_positions)
 
-        old_move = self.movement_instructions[id]
+        old_move = self.dirs[self.genome[id]]
         valid_dirs = self._get_valid_dirs_for_position(pos= pos)
         valid_dirs = list(filter(lambda d: d != old_move,valid_dirs))
-        new_move = random.choice(valid_dirs) 
+        new_move = self.rng.choice(valid_dirs) 
 
         ## cut the path 
-        self.path = self.path[:max(id,1)]           
-        self.movement_instructions = self.movement_instructions[:max(id-1,0)]
+        self.set_genome(self.cells[:max(id,1)], self.genome[:max(id-1,0)])
 
         ## set the next move 
         remaining_movement_instructions = [new_move]
@@ -0,0 +1,91 @@
+## std libs
+import json
+import time
+
+
+class GenerationProfiler:
+    '''
+    Records per generation timings and counters of a 'GeneticAlgorithm' run.
+    Pass it to the algorithm with 'GeneticAlgorithm(..., profiler=GenerationProfiler())'.
+    Without a profiler nothing is recorded and the hot paths only pay for an 'is None' check.
+
+    Every generation gets one record (dict) with:
+        generation   -- generation number
+        total        -- seconds spent in the generation
+        evaluate     -- seconds spent in '_evaluate_population'
+        selection    -- seconds spent in '_selection' (selection and crossover)
+        mutation     -- seconds spent in '_mutation'
+        walk         -- seconds spent in 'Player.walk' (this overlaps with the phases above)
+        steps_walked -- number of steps taken by all players
+        cells_probed -- number of fields checked for walls/visited while walking and mutating
+        crossovers   -- number of crossovers (each makes 2 children)
+        mutations    -- number of mutated players
+        cache_hits   -- finished players scored from the 'EvaluationCache' (0 without a cache)
+        cache_misses -- finished players that were not in the cache and were evaluated
+        best_fitness -- best fitness at the end of the generation
+    '''
+    PHASES = ('evaluate', 'selection', 'mutation', 'walk')
+    COUNTERS = ('steps_walked', 'cells_probed', 'crossovers', 'mutations', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.records = []                   ## one dict per finished generation
+        self._current = None                ## record of the running generation
+        self._started = None                ## 'perf_counter' at the start of the running generation
+
+
+    def start_generation(self, generation: int):
+        self._current = {'generation': generation, 'total': 0.0}
+        self._current.update({phase: 0.0 for phase in self.PHASES})
+        self._current.update({counter: 0 for counter in self.COUNTERS})
+        self._started = time.perf_counter()
+
+
+    def end_generation(self, best_fitness: float):
+        if self._current is None:
+            return
+        self._current['total'] = time.perf_counter() - self._started
+        self._current['best_fitness'] = best_fitness
+        self.records.append(self._current)
+        self._current = None
+
+
+    def add_time(self, phase: str, seconds: float):
+        '''
+        Adds time to a phase of the running generation. Ignored outside of a generation.
+        '''
+        if self._current is not None:
+            self._current[phase] += seconds
+
+
+    def count(self, counter: str, amount: int=1):
+        '''
+        Increments a counter of the running generation. Ignored outside of a generation.
+        '''
+        if self._current is not None:
+            self._current[counter] += amount
+
+
+    def totals(self) -> dict:
+        '''
+        Returns:
+            totals dict -- all timings and counters summed over the recorded generations
+        '''
+        keys = ('total',) + self.PHASES + self.COUNTERS
+        return {key: sum(record[key] for record in self.records) for key in keys}
+
+
+    def to_json(self, indent: int=None) -> str:
+        return json.dumps({'generations': self.records, 'totals': self.totals()}, indent=indent)
+
+
+    def to_table(self) -> str:
+        '''
+        Returns:
+            table str -- the records as a fixed width text table, one line per generation
+        '''
+        columns = ('generation', 'total') + self.PHASES + self.COUNTERS + ('best_fitness',)
+        rows = [columns]
+        for record in self.records:
+            rows.append(tuple(f"{record[column]:.4f}" if isinstance(record[column], float) else str(record[column]) for column in columns))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+        return "\n".join(" ".join(value.rjust(width) for value, width in zip(row, widths)) for row in rows)
@@ -0,0 +1,88 @@
+'''
+Selection operators of the genetic algorithm. Fitness is a distance, so the lower the better.
+
+Every operator takes the fitness of the population and returns the ids of 'count' parents (ids may repeat), consecutive parents are crossed.
+They run in linear time (no full sort of the population), the elites are picked with a partial selection ('elite_ids').
+    tournament  -- every parent is the best of 'tournament_size' random individuals
+    sus         -- stochastic universal sampling, fitness proportional with a single spin ('count' evenly spaced pointers), weights are 'max fitness - fitness'
+    truncation  -- parents are drawn uniformly from the best 'truncation_rate' of the population
+    rank        -- linear ranking: two random individuals, the better one wins with probability 'pressure / 2'. This gives the same selection
+                   probabilities as linear ranking with selection pressure 'pressure' (1 none, 2 the most), without ranking the population
+'weighted' is the original scheme of 'GeneticAlgorithm' (rank times a random number, over the sorted population) and stays the default.
+'''
+
+## 3rd party libs
+import numpy as np
+
+
+def elite_ids(fitness: np.ndarray, count: int) -> np.ndarray:
+    '''
+    Paramaters:
+        fitness np.ndarray -- fitness of every individual
+        count int -- number of elites
+    Returns:
+        ids np.ndarray -- ids of the 'count' best individuals, from the best to the worst
+    '''
+    count = min(max(count, 0), fitness.size)
+    if count <= 0:
+        return np.zeros(0, dtype=np.intp)
+    ids = np.argpartition(fitness, count - 1)[:count] if count < fitness.size else np.arange(fitness.size)
+    return ids[np.argsort(fitness[ids], kind='stable')]
+
+
+def tournament(fitness: np.ndarray, count: int, rng: np.random.Generator, tournament_size: int=3) -> np.ndarray:
+    contestants = rng.integers(0, fitness.size, size=(count, tournament_size))
+    return contestants[np.arange(count), np.argmin(fitness[contestants], axis=1)]
+
+
+def stochastic_universal_sampling(fitness: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+    weights = fitness.max() - fitness
+    if weights.sum() <= 0:
+        weights = np.ones(fitness.size)         ## all equally fit
+    cumulative = np.cumsum(weights)
+    spacing = cumulative[-1] / count
+    pointers = (rng.random() + np.arange(count)) * spacing
+    selected = np.minimum(np.searchsorted(cumulative, pointers, side='right'), fitness.size - 1)
+    return rng.permutation(selected)            ## the pointers are in order, shuffle so neighbors in the population don't always mate
+
+
+def truncation(fitness: np.ndarray, count: int, rng: np.random.Generator, truncation_rate: float=0.5) -> np.ndarray:
+    best = elite_ids(fitness, max(int(truncation_rate * fitness.size), 1))
+    return best[rng.integers(0, best.size, size=count)]
+
+
+def rank(fitness: np.ndarray, count: int, rng: np.random.Generator, pressure: float=1.5) -> np.ndarray:
+    first, second = rng.integers(0, fitness.size, size=(2, count))
+    first_is_better = fitness[first] <= fitness[second]
+    better = np.where(first_is_better, first, second)
+    worse = np.where(first_is_better, second, first)
+    return np.where(rng.random(count) < pressure / 2, better, worse)
+
+
+OPERATORS = {
+    'tournament': tournament,
+    'sus': stochastic_universal_sampling,
+    'truncation': truncation,
+    'rank': rank,
+}
+SELECTIONS = ('weighted',) + tuple(OPERATORS)       ## values of 'GeneticAlgorithm(selection=...)'
+
+
+def select_parents(selection: str, fitness: np.ndarray, count: int, rng: np.random.Generator, tournament_size: int=3) -> np.ndarray:
+    '''
+    Paramaters:
+        selection str -- one of 'OPERATORS'
+        fitness np.ndarray -- fitness of every individual
+        count int -- number of parents
+        rng np.random.Generator
+        tournament_size int -- only for 'tournament'
+    Returns:
+        parents np.ndarray -- ids of the parents, consecutive ones are crossed
+    '''
+    if selection not in OPERATORS:
+        raise ValueError(f"Unknown selection '{selection}', expected one of {tuple(OPERATORS)}")
+    if count <= 0 or fitness.size <= 0:
+        return np.zeros(0, dtype=np.intp)
+    if selection == 'tournament':
+        return tournament(fitness, count, rng, tournament_size)
+    return OPERATORS[selection](fitness, count, rng)
@@ -0,0 +1,131 @@
+## std libs
+from array import array
+from itertools import chain
+
+
+CHUNK_SIZE = 256            ## entries per frozen chunk
+
+
+class SharedPath:
+    '''
+    Append-only sequence of ints ('array' typecode) made of frozen chunks that are shared between paths, plus a private tail.
+    A prefix ('path[:k]') shares every complete chunk with the original and only copies the rest (less than 'CHUNK_SIZE' entries), so
+    crossover children, mutants and restarted individuals don't copy their parents' paths and identical prefixes are stored once in the population.
+    Chunks are never modified once they are full (copy on write happens by copying the partial chunk into the new tail).
+    Supports what 'Player' needs from an 'array': indexing, 'len', iteration, prefix slices, 'append', 'extend' and 'tobytes'.
+    'last' is the last entry (None if empty), a plain attribute so the walking loop doesn't pay for a '[-1]' lookup.
+    Paramaters:
+        typecode str -- 'array' typecode of the entries, e.g. 'i' for packed fields or 'B' for direction codes
+        values iterable -- initial entries
+    '''
+    __slots__ = ('typecode', '_chunks', '_tail', 'last')
+
+    def __init__(self, typecode: str, values=()):
+        self.typecode = typecode
+        self._chunks = ()                   ## tuple of full chunks, each exactly CHUNK_SIZE long and never modified again. Short paths share the empty tuple
+        self._tail = array(typecode)        ## entries after the last full chunk, owned by this path
+        self.last = None
+        if values:
+            self.extend(values)
+
+
+    def __len__(self) -> int:
+        return len(self._chunks) * CHUNK_SIZE + len(self._tail)
+
+
+    def __iter__(self):
+        return chain(chain.from_iterable(self._chunks), self._tail)
+
+
+    def __getitem__(self, index):
+        if index == -1:
+            if self.last is None:
+                raise IndexError('SharedPath index out of range')
+            return self.last
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if start == 0 and step == 1:
+                return self._prefix(max(stop, 0))
+            return self.to_array()[index]
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('SharedPath index out of range')
+        chunk, offset = divmod(index, CHUNK_SIZE)
+        if chunk < len(self._chunks):
+            return self._chunks[chunk][offset]
+        return self._tail[offset]
+
+
+    def _prefix(self, length: int) -> 'SharedPath':
+        '''
+        Returns:
+            prefix SharedPath -- the first 'length' entries, sharing the complete chunks
+        '''
+        prefix = SharedPath.__new__(SharedPath)
+        prefix.typecode = self.typecode
+        full_chunks, rest = divmod(length, CHUNK_SIZE)
+        if full_chunks < len(self._chunks):
+            prefix._chunks = self._chunks[:full_chunks]
+            prefix._tail = self._chunks[full_chunks][:rest]
+        else:
+            prefix._chunks = self._chunks
+            prefix._tail = self._tail[:rest]
+        if rest:
+            prefix.last = prefix._tail[-1]
+        else:
+            prefix.last = prefix._chunks[-1][-1] if prefix._chunks else None
+        return prefix
+
+
+    def append(self, value: int):
+        tail = self._tail
+        tail.append(value)
+        self.last = value
+        if len(tail) == CHUNK_SIZE:
+            self._chunks += (tail,)         ## frozen from now on
+            self._tail = array(self.typecode)
+
+
+    def extend(self, values):
+        if not isinstance(values, array):
+            values = array(self.typecode, values)
+        if not values:
+            return
+        position = 0
+        while position < len(values):
+            tail = self._tail
+            space = CHUNK_SIZE - len(tail)
+            tail.extend(values[position:position + space])
+            position += space
+            if len(tail) == CHUNK_SIZE:
+                self._chunks += (tail,)
+                self._tail = array(self.typecode)
+        self.last = values[-1]
+
+
+    def buffers(self) -> list:
+        '''
+        Returns:
+            buffers list -- the chunks and the tail, in order (e.g. for hashing without joining them)
+        '''
+        return list(self._chunks) + [self._tail]
+
+
+    def tobytes(self) -> bytes:
+        return b''.join(buffer.tobytes() for buffer in self.buffers())
+
+
+    def to_array(self) -> array:
+        '''
+        Returns:
+            values array -- a private copy of all entries
+        '''
+        values = array(self.typecode)
+        values.frombytes(self.tobytes())
+        return values
+
+
+    def __repr__(self):
+        return f"SharedPath({self.typecode!r}, {self.to_array().tolist()})"